@@ -0,0 +1,52 @@
+"""
+=====================
+Iofile read benchmark
+=====================
+
+Compares the default object dtype parsing of iofile.read to the typed
+read mode. Run inside a TheSyDeKick tree::
+
+    python3 benchmarks/iofile_read.py --rows 1000000 --cols 2
+
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from thesdk import *
+from thesdk.iofile import iofile
+
+class bench_entity(thesdk):
+    def __init__(self):
+        self.model='py'
+        self.supress_output=True
+
+if __name__=="__main__":
+    parser=argparse.ArgumentParser(description='Benchmark iofile.read')
+    parser.add_argument('--rows',type=int,default=1000000)
+    parser.add_argument('--cols',type=int,default=2)
+    parser.add_argument('--datatype',default='complex')
+    args=parser.parse_args()
+
+    entity=bench_entity()
+    data=np.random.randint(-2**15,2**15,(args.rows,args.cols))
+    if args.datatype in [ 'complex', 'scomplex' ]:
+        data=data+1j*np.random.randint(-2**15,2**15,(args.rows,args.cols))
+    fd,path=tempfile.mkstemp(suffix='.txt')
+    os.close(fd)
+    f=iofile(entity,name='bench',datatype=args.datatype)
+    f.file=path
+    f.write(data=data)
+    reference=None
+    for typed in [ False, True ]:
+        start=time.perf_counter()
+        f.read(typed=typed)
+        duration=time.perf_counter()-start
+        if reference is None:
+            reference=f.Data
+        elif not np.array_equal(reference.astype(f.Data.dtype),f.Data):
+            print('Typed read result differs from the default read')
+        print('typed=%s: %d rows x %d cols in %.3f s' %(typed,args.rows,args.cols,duration))
+    os.remove(path)
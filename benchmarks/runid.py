@@ -0,0 +1,61 @@
+"""
+================
+Run id benchmark
+================
+
+Measures the throughput of thesdk.runid and checks the uniqueness of the
+generated identifiers across processes. For comparison, the throughput
+of the earlier mkstemp based names is measured, removing the created
+files. Run inside a TheSyDeKick tree::
+
+    python3 benchmarks/runid.py --count 100000 --processes 8
+
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+import thesdk.runid as runid
+
+def generate(count,queue):
+    queue.put([ runid.new() for _ in range(count) ])
+
+def mkstemp_names(count):
+    names=[]
+    for _ in range(count):
+        fd,path=tempfile.mkstemp()
+        os.close(fd)
+        os.remove(path)
+        names.append(os.path.basename(path))
+    return names
+
+if __name__=="__main__":
+    parser=argparse.ArgumentParser(description='Benchmark thesdk.runid')
+    parser.add_argument('--count',type=int,default=100000)
+    parser.add_argument('--processes',type=int,default=8)
+    args=parser.parse_args()
+
+    start=time.perf_counter()
+    names=[ runid.new() for _ in range(args.count) ]
+    duration=time.perf_counter()-start
+    print('runid: %d ids in %.3f s, %.0f ids/s' %(args.count,duration,args.count/duration))
+
+    count=min(args.count,10000)
+    start=time.perf_counter()
+    mkstemp_names(count)
+    duration=time.perf_counter()-start
+    print('mkstemp: %d ids in %.3f s, %.0f ids/s' %(count,duration,count/duration))
+
+    queue=multiprocessing.Queue()
+    procs=[ multiprocessing.Process(target=generate,args=(args.count,queue))
+            for _ in range(args.processes) ]
+    for proc in procs:
+        proc.start()
+    for _ in procs:
+        names.extend(queue.get())
+    for proc in procs:
+        proc.join()
+    duplicates=len(names)-len(set(names))
+    print('%d ids from %d processes, %d duplicates' %(len(names),args.processes+1,duplicates))
@@ -0,0 +1,222 @@
+"""
+=========================
+Benchmark suite of thesdk
+=========================
+
+Benchmarks of the hot paths of thesdk with synthetic entities:
+
+    import
+        Time to import thesdk in a new interpreter.
+    iofile
+        iofile.write and iofile.read for 'sample' and 'event' iotypes,
+        datatypes int, sint, complex and scomplex, and sizes from 1e3 rows
+        up to --max-rows. Complex data is written only with the 'sample'
+        iotype, as the timestamp of an event file can not be complex.
+    print_log
+        Time per message with and without DEBUG.
+    run_parallel
+        Wall time versus the number of DUTs and max_jobs, in 'batch' and
+        'pool' modes.
+    state
+        _write_state and _read_state latency and the size of the saved
+        state, for the 'pickle' and 'npy' state formats.
+
+Every result is a time in seconds or a size in bytes, lower is better.
+Results can be stored as a baseline, and compared against a stored
+baseline. Results exceeding the baseline by more than the tolerance are
+reported as regressions, and the exit status is 1. Baselines are
+specific to the machine they were recorded on.
+
+Run inside a TheSyDeKick tree::
+
+    # Record a baseline
+    python3 benchmarks/suite.py --save-baseline benchmarks/baseline.json
+    # Compare against it
+    python3 benchmarks/suite.py --baseline benchmarks/baseline.json
+    # Selected groups only
+    python3 benchmarks/suite.py --only iofile state --max-rows 10000000
+
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from thesdk import *
+from thesdk.iofile import iofile
+import thesdk.runid as runid
+
+GROUPS=[ 'import', 'iofile', 'print_log', 'run_parallel', 'state' ]
+
+class bench_entity(thesdk):
+    def __init__(self,root):
+        self.model='py'
+        self.supress_output=True
+        self.simpathroot=root
+        self.statepath=os.path.join(root,'states')
+        self.IOS.Members['A']=IO()
+        self.IOS.Members['Z']=IO()
+
+    def run(self):
+        self.IOS.Members['Z'].Data=self.IOS.Members['A'].Data
+        if self.par:
+            self.queue.put({ 'Z' : self.IOS.Members['Z'] })
+
+def best(func,repeat):
+    '''Minimum duration of repeat calls of func.
+
+    '''
+    durations=[]
+    for _ in range(repeat):
+        start=time.perf_counter()
+        func()
+        durations.append(time.perf_counter()-start)
+    return min(durations)
+
+def bench_import(args,root):
+    code='import time; start=time.perf_counter(); import thesdk; print(time.perf_counter()-start)'
+    durations=[]
+    for _ in range(args.repeat):
+        out=subprocess.run([ sys.executable, '-c', code ],capture_output=True,text=True,
+                env=dict(os.environ,PYTHONPATH=os.pathsep.join(sys.path))).stdout
+        durations.append(float(out.strip().splitlines()[-1]))
+    return { 'import' : min(durations) }
+
+def _iodata(rows,datatype,iotype):
+    values=np.random.randint(-2**15,2**15,(rows,2))
+    if datatype in [ 'complex', 'scomplex' ]:
+        values=values+1j*np.random.randint(-2**15,2**15,(rows,2))
+    if iotype=='event':
+        values=np.hstack((np.arange(rows).reshape(-1,1),values))
+    return values
+
+def bench_iofile(args,root):
+    results={}
+    entity=bench_entity(root)
+    sizes=[ rows for rows in [ 10**3, 10**4, 10**5, 10**6, 10**7 ] if rows <= args.max_rows ]
+    for iotype in [ 'sample', 'event' ]:
+        for datatype in [ 'int', 'sint', 'complex', 'scomplex' ]:
+            if iotype=='event' and datatype in [ 'complex', 'scomplex' ]:
+                continue
+            for rows in sizes:
+                data=_iodata(rows,datatype,iotype)
+                f=iofile(entity,name='bench',datatype=datatype,iotype=iotype,durability='none')
+                key='iofile/%s/%s/%d' %(iotype,datatype,rows)
+                results[key+'/write']=best(lambda: f.write(data=data),args.repeat)
+                results[key+'/read']=best(lambda: f.read(),args.repeat)
+                f.remove()
+    return results
+
+def bench_print_log(args,root):
+    results={}
+    entity=bench_entity(root)
+    thesdk.logfile=os.path.join(root,'bench.log')
+    count=args.messages
+    for debug in [ False, True ]:
+        entity.DEBUG=debug
+        for type in [ 'I', 'D' ]:
+            def log():
+                for n in range(count):
+                    entity.print_log(type=type,msg='Benchmark message %d',args=(n,))
+                thesdk.flush_log()
+            results['print_log/%s/debug=%s' %(type,debug)]=best(log,args.repeat)/count
+    return results
+
+def bench_run_parallel(args,root):
+    results={}
+    for mode in [ 'batch', 'pool' ]:
+        for nduts in [ 2, 4, 8 ]:
+            for max_jobs in [ 1, 2, 4 ]:
+                if max_jobs > nduts:
+                    continue
+                def run():
+                    duts=[ bench_entity(root) for _ in range(nduts) ]
+                    for dut in duts:
+                        dut.IOS.Members['A'].Data=np.arange(1000)
+                    duts[0].run_parallel(duts=duts,max_jobs=max_jobs,mode=mode)
+                results['run_parallel/%s/duts=%d/max_jobs=%d' %(mode,nduts,max_jobs)] \
+                        =best(run,args.repeat)
+    return results
+
+def bench_state(args,root):
+    results={}
+    for state_format in [ 'pickle', 'npy' ]:
+        for rows in [ 10**4, 10**6 ]:
+            entity=bench_entity(root)
+            entity.state_format=state_format
+            entity.IOS.Members['Z'].Data=np.random.randn(rows)*(1+1j)
+            key='state/%s/%d' %(state_format,rows)
+            def write():
+                # New state directory for every write
+                entity.runname=runid.new()
+                entity.statedir='%s/%s' %(entity.statepath,entity.runname)
+                entity._write_state()
+            results[key+'/write']=best(write,args.repeat)
+            results[key+'/size']=sum(os.path.getsize(os.path.join(path,name))
+                    for path,_,names in os.walk(entity.statedir) for name in names)
+            loader=bench_entity(root)
+            loader.load_state=entity.runname
+            results[key+'/read']=best(loader._read_state,args.repeat)
+    return results
+
+def compare(results,baseline,tolerance):
+    '''Prints the ratio of results to baseline. Returns the keys
+    exceeding the baseline by more than tolerance.
+
+    '''
+    regressions=[]
+    for key,value in results.items():
+        if key not in baseline or not baseline[key]:
+            continue
+        ratio=value/baseline[key]
+        status=''
+        if ratio > 1+tolerance:
+            status='REGRESSION'
+            regressions.append(key)
+        print('%-50s %12.6g %12.6g %8.2f %s' %(key,baseline[key],value,ratio,status))
+    return regressions
+
+if __name__=="__main__":
+    parser=argparse.ArgumentParser(description='Benchmark suite of thesdk')
+    parser.add_argument('--only',nargs='+',choices=GROUPS,default=GROUPS)
+    parser.add_argument('--max-rows',type=float,default=1e6)
+    parser.add_argument('--messages',type=int,default=20000)
+    parser.add_argument('--repeat',type=int,default=3)
+    parser.add_argument('--output',help='Write results to file')
+    parser.add_argument('--baseline',help='Compare results to baseline file')
+    parser.add_argument('--save-baseline',help='Store results as baseline file')
+    parser.add_argument('--tolerance',type=float,default=0.25,
+            help='Allowed relative increase over baseline')
+    args=parser.parse_args()
+
+    root=tempfile.mkdtemp(prefix='thesdk_bench_')
+    results={}
+    try:
+        for group in args.only:
+            start=time.perf_counter()
+            results.update(globals()['bench_%s' %(group)](args,root))
+            print('%s done in %.1f s' %(group,time.perf_counter()-start))
+    finally:
+        shutil.rmtree(root,ignore_errors=True)
+
+    for key,value in results.items():
+        print('%-50s %12.6g' %(key,value))
+    record={ 'time' : time.strftime('%Y-%m-%d %H:%M:%S'), 'python' : sys.version.split()[0],
+            'cpus' : os.cpu_count(), 'results' : results }
+    for filename in [ args.output, args.save_baseline ]:
+        if filename:
+            with open(filename,'w') as fid:
+                json.dump(record,fid,indent=1)
+    if args.baseline:
+        with open(args.baseline) as fid:
+            baseline=json.load(fid)['results']
+        print('%-50s %12s %12s %8s' %('Benchmark','Baseline','Result','Ratio'))
+        regressions=compare(results,baseline,args.tolerance)
+        if regressions:
+            print('%d regressions' %(len(regressions)))
+            sys.exit(1)
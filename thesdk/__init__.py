@@ -25,6 +25,7 @@ import glob
 import getpass
 import time
 import tempfile
+import shutil
 import re
 import abc
 from abc import *
@@ -38,6 +39,9 @@ import functools
 import contextlib as cl
 import pdb
 import pickle
+import concurrent.futures
+import asyncio
+import threading
 from datetime import datetime
 
 #Set 'must have methods' with abstractmethod
@@ -45,10 +49,32 @@ from datetime import datetime
 #Using this decorator requires that the class’s metaclass is ABCMeta or is
 #derived from it. A class that has a metaclass derived from ABCMeta cannot
 #be instantiated unless all of its abstract methods and properties are overridden.
+_import_start=time.perf_counter()
 from thesdk.bundle import Bundle
+import thesdk.bootstrap as bootstrap
+import thesdk.fsstats as fsstats
+import thesdk.runid as runid
+from thesdk.profiler import profiler, profiled
+from thesdk.config import Config
+import thesdk.state as state
+from thesdk.state import StateStore, Catalogue
+import thesdk.cache as cache
+from thesdk.cache import ResultCache
+from thesdk.logwriter import LogWriter
+import thesdk.parallel as parallel
+import thesdk.aio as aio
+
+# Color escape strings for stdout prints, indexed by print_colors
+# (end, red, green, yellow, blue, violet)
+_logcolors={
+        True  : ('\33[0m', '\33[31m', '\33[32m', '\33[33m', '\33[34m', '\33[35m'),
+        False : ('', '', '', '', '', '')
+        }
+
 class thesdk(metaclass=abc.ABCMeta):
     '''
-    Following class attributes are set when this class imported
+    Following class attributes are set when this class imported.
+    MODULEPATHS and GLOBALS are resolved on first access. See thesdk.bootstrap.
 
     Attributes
     ----------
@@ -62,18 +88,22 @@ class thesdk(metaclass=abc.ABCMeta):
 
     MODULEPATHS: str
         List of directories under HOME/Entities  that contain __init__.py file.
-        Appended to sys.path to locate TheSyDeKick system modules
+        Appended to sys.path to locate TheSyDeKick system modules. Resolved
+        at the latest when an import is not found otherwise.
 
     logfile: str
        Default logfile:  /tmp/TheSDK_randomstr_uname_YYYYMMDDHHMM.log
        Override with initlog if you want something else
 
     global_parameters: list(str)
-       List of global parameters to be read to GLOBALS dictionary from CONFIGFILE
+       List of well known global parameters of CONFIGFILE. Printed when GLOBALS is created.
+
+    CONFIG: thesdk.config.Config
+       Parsed CONFIGFILE. Use CONFIG.get(key,default,type) to query
+       entries with type conversion.
 
     GLOBALS: dict
-       Dictionary of global parameters, keys defined by global_parameters,
-       values defined in CONFIGFILE
+       Dictionary of all KEY=value entries of CONFIGFILE
 
     '''
 
@@ -86,7 +116,6 @@ class thesdk(metaclass=abc.ABCMeta):
     CONFIGFILE=HOME+'/TheSDK.config'
     print("Config file of TheSDK is %s" %(CONFIGFILE))
 
-    #This variable becomes redundant after the GLOBALS dictionary is created
     global_parameters=[
             'LSFSUBMISSION',
             'LSFINTERACTIVE',
@@ -96,52 +125,78 @@ class thesdk(metaclass=abc.ABCMeta):
             'VHDLLIBFILE'
             ]
 
-    # Append all SDK python modules to path. Strategy:
-    # 1. iterate over paths starting from Entities directory
-    # 2.1 if Entities/<path> is not a file, check if Entities/<path>/<path>/__init__.py exists
-    # 3. If it does, it is a SDK module -> add to path
-
-    MODULEPATHS=[]
-    root = os.path.join(HOME, 'Entities')
-    for item in os.listdir(root):
-        if not os.path.isfile(os.path.join(root, item)):
-            if os.path.isfile(os.path.join(root, item, item, '__init__.py')):
-                MODULEPATHS.append(os.path.join(root, item))
-    for i in list(set(MODULEPATHS)-set(sys.path)):
-        if 'BagModules' not in i:
-            print("Adding %s to system path" %(i))
-            sys.path.append(i)
-
-    logfile=("/tmp/TheSDK_" + os.path.basename(tempfile.mkstemp()[1])+"_"+getpass.getuser()
+    # Append all SDK python modules to path on first access.
+    # Strategy in bootstrap.modulepaths
+    @bootstrap.lazyclassattr
+    def MODULEPATHS(cls):
+        paths=bootstrap.modulepaths(cls.HOME)
+        for i in list(set(paths)-set(sys.path)):
+            if 'BagModules' not in i:
+                print("Adding %s to system path" %(i))
+                sys.path.append(i)
+        return paths
+
+    logfile=("/tmp/TheSDK_" + runid.tag()+"_"+getpass.getuser()
         +"_"+time.strftime("%Y%m%d%H%M")+".log")
     if os.path.isfile(logfile):
         os.remove(logfile)
     print("Setting default logfile %s" %(logfile))
     #Do not create the logfile here
+    # Writer of the logfile, see set_log_backend
+    _logwriter=LogWriter()
+    # Logfile known to be initialized, spares a stat per message
+    _loginitialized=None
     #----logfile stuff ends here
 
     # Parse the glopal parameters from a TheSDK.config to a dict
-    # Delete parameter list as not needed any more
-    GLOBALS={}
-    for name in global_parameters:
-        with  open(CONFIGFILE,'r') as fid:
-            global match
-            match='('+name+'=)(.*)'
-            func_list=(
-                lambda s: re.sub(match,r'\2',s),
-                lambda s: re.sub(r'"','',s),
-                lambda s: re.sub(r'\n','',s)
-            )
-            for line in fid:
-                if re.match(match,line):
-                    GLOBALS[name]=reduce(lambda s, func: func(s), func_list, line)
-                    print("GLOBALS[%s]='%s'"%(name,GLOBALS[name]))
-        fid.close()
-    del match
-    del global_parameters
-    del name
+    # on first access
+    @bootstrap.lazyclassattr
+    def CONFIG(cls):
+        return Config(cls.CONFIGFILE)
+
+    @bootstrap.lazyclassattr
+    def GLOBALS(cls):
+        globals=dict(cls.CONFIG.entries)
+        for name in cls.global_parameters:
+            if name in globals:
+                print("GLOBALS[%s]='%s'"%(name,globals[name]))
+        return globals
     #----Global parameter stuff ends here
 
+    @classmethod
+    def bootstrap_report(cls):
+        '''Prints the time spent in import and in the lazy initialization
+        of the class attributes.
+
+        Example::
+
+            thesdk.bootstrap_report()
+
+        '''
+        print(bootstrap.report())
+
+    @classmethod
+    def fs_report(cls,reset=False):
+        '''Prints the number of filesystem calls made by thesdk and
+        iofile since import or the previous reset, by kind of call.
+        See thesdk.fsstats.
+
+        Parameters
+        ----------
+        reset : bool, False
+            Reset the counts after printing.
+
+        Example::
+
+            thesdk.fs_report(reset=True)
+            self.run()
+            thesdk.fs_report()
+
+        '''
+        print(fsstats.report())
+        if reset:
+            fsstats.reset()
+
     @classmethod
     def initlog(cls,*arg):
         '''Initializes logging. logfile passed as a parameter
@@ -149,25 +204,49 @@ class thesdk(metaclass=abc.ABCMeta):
         if len(arg) > 0:
             __class__.logfile=arg[0]
 
+        # Release the handle of the previous logfile
+        __class__._logwriter.close()
         if os.path.isfile(__class__.logfile):
             os.remove(__class__.logfile)
         typestr="[INFO]"
         # Colors for stdout prints
-        cend    = '' if not cls.print_colors else '\33[0m'
-        cblack  = '' if not cls.print_colors else '\33[30m'
-        cred    = '' if not cls.print_colors else '\33[31m'
-        cgreen  = '' if not cls.print_colors else '\33[32m'
-        cyellow = '' if not cls.print_colors else '\33[33m'
-        cblue   = '' if not cls.print_colors else '\33[34m'
-        cviolet = '' if not cls.print_colors else '\33[35m'
-        cbeige  = '' if not cls.print_colors else '\33[36m'
-        cwhite  = '' if not cls.print_colors else '\33[37m'
+        cend, cred, cgreen, cyellow, cblue, cviolet = _logcolors[bool(cls.print_colors)]
         msg="Default logfile override. Initialized logging in %s" %(__class__.logfile)
         print("%s %s%s%s %s: %s" %(time.strftime("%H:%M:%S"),cgreen,typestr,cend,
             __class__.__name__ , msg))
-        fid= open(__class__.logfile, 'a')
-        fid.write("%s %s %s: %s\n" %(time.strftime("%H:%M:%S"),typestr, __class__.__name__ , msg))
-        fid.close()
+        __class__._logwriter.write(__class__.logfile,
+                "%s %s %s: %s\n" %(time.strftime("%H:%M:%S"),typestr, __class__.__name__ , msg))
+        __class__._loginitialized=__class__.logfile
+
+    @classmethod
+    def set_log_backend(cls,backend='buffered',flush_interval=1.0):
+        '''Selects how the log messages are written to the logfile.
+
+        Parameters
+        ----------
+        backend: str, 'buffered'
+            'direct' = Logfile is opened and closed for every message (default of thesdk)
+            'buffered' = Single persistent buffered file handle
+            'thread' = Messages are written by a background thread
+        flush_interval: float, 1.0
+            Maximum time in seconds messages are held in buffers.
+
+        Pending messages are written at exit, before forking
+        parallel runs and on fatal errors.
+
+        Example::
+
+            thesdk.set_log_backend('buffered',flush_interval=5)
+
+        '''
+        __class__._logwriter.configure(backend=backend,flush_interval=flush_interval)
+
+    @classmethod
+    def flush_log(cls):
+        '''Writes pending log messages to the logfile.
+
+        '''
+        __class__._logwriter.flush()
 
     #Common properties
     @property
@@ -256,21 +335,36 @@ class thesdk(metaclass=abc.ABCMeta):
         Simulation path. (./simulations/<model>/<runname>)
         This is not meant to be set manually. Use 'simpathroot'
         to relocate.
+
+        The directory is created on first access. The path is cached per
+        combination of simpathroot, model and runname, and resolved again
+        when any of them changes. Call `reset_simpath` if the directory
+        is removed and should be created again.
         """
         #This property is dependent, it should not be fixed in creation
         name = self.runname if self.runname != '' else self.load_state
-        self._simpath = '%s/simulations/%s/%s' % (self.simpathroot,self.model,name)
-        try:
-            if not (os.path.exists(self._simpath)):
-                os.makedirs(self._simpath)
-                self.print_log(type='I',msg='Creating %s' % self._simpath)
-        except:
-            self.print_log(type='E',msg='Failed to create %s' % self._simpath)
+        key = (self.simpathroot,self.model,name)
+        if self.__dict__.get('_simpath_key') != key:
+            self._simpath = '%s/simulations/%s/%s' % key
+            try:
+                if not (fsstats.exists(self._simpath)):
+                    fsstats.makedirs(self._simpath,exist_ok=True)
+                    self.print_log(type='I',msg='Creating %s' % self._simpath)
+                self._simpath_key = key
+            except:
+                self.print_log(type='E',msg='Failed to create %s' % self._simpath)
         return self._simpath
     @simpath.setter
     def simpath(self,val):
         self.print_log(type='F', msg="Setting simpath has no effect. Set 'simpathroot' instead.")
 
+    def reset_simpath(self):
+        """Discard the cached simpath. The directory is checked, and
+        created if needed, on next access of simpath.
+
+        """
+        self.__dict__.pop('_simpath_key',None)
+
     @property
     def has_lsf(self):
         """True | False (default)
@@ -300,6 +394,22 @@ class thesdk(metaclass=abc.ABCMeta):
     def preserve_iofiles(self,value):
         self._preserve_iofiles=value
 
+    @property
+    def iofile_durability(self):
+        """'none' | 'fsync' (default) | 'batch'
+
+        Default durability mode of the iofiles of this entity.
+        See iofile.durability. With 'batch', call sync_iofile_bundle
+        after all the files are written and before the simulator is
+        launched."""
+
+        if not hasattr(self,'_iofile_durability'):
+            self._iofile_durability = 'fsync'
+        return self._iofile_durability
+    @iofile_durability.setter
+    def iofile_durability(self,value):
+        self._iofile_durability=value
+
     @property
     def pickle_excludes(self):
         ''' list : Properties of entity to be excluded from pickling when saving entity state to disk.
@@ -352,14 +462,15 @@ class thesdk(metaclass=abc.ABCMeta):
             for prop in self.proplist:
                 if hasattr(self,prop) and hasattr(self.parent, prop):
                     #Its nice to see how things propagate
-                    msg="Setting %s: %s to %s" %(self, prop, getattr(self.parent,prop))
+                    msg="Setting %s: %s to %s"
                     # As nice as it is to see how things propagate, it quickly fill the logfiles with garbage
-                    self.print_log(type= self.copy_propval_verbosity, msg=msg)
+                    self.print_log(type= self.copy_propval_verbosity, msg=msg,
+                            args=(self, prop, getattr(self.parent,prop)))
                     setattr(self,prop,getattr(self.parent,prop))
                 else:
                     obj = self if not hasattr(self, prop) else self.parent
-                    msg = "Property %s not defined for entity %s, omitting copy!" % (prop,obj)
-                    self.print_log(type='D',msg=msg)
+                    msg = "Property %s not defined for entity %s, omitting copy!"
+                    self.print_log(type='D',msg=msg,args=(prop,obj))
 
     @property
     def copy_propval_verbosity(self):
@@ -393,6 +504,21 @@ class thesdk(metaclass=abc.ABCMeta):
     def supress_output(self, val):
         self._supress_output=val
 
+    @property
+    def _print_paths(self):
+        ''' Entity paths replaced with '.' in printed messages when
+        print_relative_path is True. Cached, and updated if the parent
+        changes.
+
+        '''
+        parent=self.parent if hasattr(self,'parent') else None
+        if not hasattr(self,'_print_paths_cache') or self._print_paths_cache[0] != id(parent):
+            paths=[ self.entitypath ]
+            if hasattr(self,'parent'):
+                paths.append(parent.entitypath)
+            self._print_paths_cache=(id(parent),paths)
+        return self._print_paths_cache[1]
+
     #Method for logging
     #This is a method because it uses the logfile property
     def print_log(self,**kwargs):
@@ -409,39 +535,49 @@ class thesdk(metaclass=abc.ABCMeta):
                     'F' = Fatal, quits the execution
                     'O' = Obsolete, used for obsolition warnings.
 
-                 msg: str
-                     The messge to be printed
+                 msg: str | callable
+                     The messge to be printed. If callable, it is called
+                     without arguments to produce the message, only if the
+                     message is printed.
+
+                 args: tuple
+                     Arguments for formatting msg with the % operator. Formatting
+                     is done only if the message is printed.
+
+        Debug messages are discarded before any formatting if DEBUG is False,
+        so the lazy forms are preferred for messages with costly arguments::
+
+            self.print_log(type='D', msg='Loading %s from %s', args=(name, path))
+            self.print_log(type='D', msg=lambda: 'Data at %s' % hex(id(data)))
 
         '''
 
         type=kwargs.get('type','I')
+        if type == 'D' and not self.DEBUG:
+            return
         msg=kwargs.get('msg',"Print this to log")
+        if callable(msg):
+            msg=msg()
+        if 'args' in kwargs:
+            msg=msg % kwargs['args']
 
         # Converting absolute file paths to relative file paths
         if self.print_relative_path:
-            msg = msg.replace(self.entitypath,'.')
-            if hasattr(self,'parent'):
-                msg = msg.replace(self.parent.entitypath,'.')
+            for path in self._print_paths:
+                msg = msg.replace(path,'.')
 
         # Colors for stdout prints
-        cend    = '' if not self.print_colors else '\33[0m'
-        cblack  = '' if not self.print_colors else '\33[30m'
-        cred    = '' if not self.print_colors else '\33[31m'
-        cgreen  = '' if not self.print_colors else '\33[32m'
-        cyellow = '' if not self.print_colors else '\33[33m'
-        cblue   = '' if not self.print_colors else '\33[34m'
-        cviolet = '' if not self.print_colors else '\33[35m'
-        cbeige  = '' if not self.print_colors else '\33[36m'
-        cwhite  = '' if not self.print_colors else '\33[37m'
-
-        if not os.path.isfile(thesdk.logfile):
-            typestr="[INFO]"
-            initmsg="Initialized logging in %s" %(thesdk.logfile)
-            print("%s %s%s%s %s: %s" %(time.strftime("%H:%M:%S"),cgreen,typestr,cend,
-                self.__class__.__name__ , initmsg))
-            fid= open(thesdk.logfile, 'a')
-            fid.write("%s %s thesdk: %s\n" %(time.strftime("%H:%M:%S"), typestr, initmsg))
-            fid.close()
+        cend, cred, cgreen, cyellow, cblue, cviolet = _logcolors[bool(self.print_colors)]
+
+        if thesdk._loginitialized != thesdk.logfile:
+            if not os.path.isfile(thesdk.logfile):
+                typestr="[INFO]"
+                initmsg="Initialized logging in %s" %(thesdk.logfile)
+                print("%s %s%s%s %s: %s" %(time.strftime("%H:%M:%S"),cgreen,typestr,cend,
+                    self.__class__.__name__ , initmsg))
+                thesdk._logwriter.write(thesdk.logfile,
+                        "%s %s thesdk: %s\n" %(time.strftime("%H:%M:%S"), typestr, initmsg))
+            thesdk._loginitialized=thesdk.logfile
 
         if type == 'D':
             if self.DEBUG:
@@ -450,10 +586,8 @@ class thesdk(metaclass=abc.ABCMeta):
                     print("%s %s%s%s %s: %s" %(time.strftime("%H:%M:%S"),cblue,typestr,cend, 
                     self.__class__.__name__ , msg))
                 if hasattr(self,"logfile"):
-                    fid= open(thesdk.logfile, 'a')
-                    fid.write("%s %s %s: %s\n" %(time.strftime("%H:%M:%S"),
+                    thesdk._logwriter.write(thesdk.logfile,"%s %s %s: %s\n" %(time.strftime("%H:%M:%S"),
                     typestr, self.__class__.__name__ , msg))
-                    fid.close()
             return
         elif type == 'I':
             typestr ="[INFO]"
@@ -482,10 +616,9 @@ class thesdk(metaclass=abc.ABCMeta):
                 self.__class__.__name__ , msg))
             print("Quitting due to fatal error in %s" %(self.__class__.__name__))
             if hasattr(self,"logfile"):
-                fid= open(thesdk.logfile, 'a')
-                fid.write("%s Quitting due to fatal error in %s.\n"
+                thesdk._logwriter.write(thesdk.logfile,"%s Quitting due to fatal error in %s.\n"
                         %( time.strftime("%H:%M:%S"), self.__class__.__name__))
-                fid.close()
+                thesdk._logwriter.flush()
                 if self.par:
                     self.queue.put({})
                 # Exit with non-zero exit code
@@ -498,10 +631,8 @@ class thesdk(metaclass=abc.ABCMeta):
 
         #If logfile set, print also there
         if hasattr(self,"logfile"):
-            fid= open(thesdk.logfile, 'a')
-            fid.write("%s %s %s: %s\n" %(time.strftime("%H:%M:%S"),
+            thesdk._logwriter.write(thesdk.logfile,"%s %s %s: %s\n" %(time.strftime("%H:%M:%S"),
                 typestr, self.__class__.__name__ , msg))
-            fid.close()
 
     def timer(func):
         """Timer decorator
@@ -529,17 +660,67 @@ class thesdk(metaclass=abc.ABCMeta):
             >> print(result)
             42
 
+        The call is also recorded as a region in the profiler, see
+        `profile`.
+
         """
         @functools.wraps(func)
         def wrapper_timer(*args, **kwargs):
             start = time.perf_counter()
-            retval = func(*args, **kwargs)
+            with profiler.region(func.__name__,args[0]):
+                retval = func(*args, **kwargs)
             stop = time.perf_counter()
             duration = stop-start
             args[0].print_log(type='I',msg='Finished \'%s\' in %.03f s.' % (func.__name__,duration))
             return retval
         return wrapper_timer
 
+    def profile(self,name):
+        """Context manager timing the enclosed code as a profiled region.
+        Nothing is printed, see `profile_report`.
+
+        Regions nest by call, and are labeled with the class names of the
+        entity and its parents. Iofile reads and writes, state saving and
+        loading and parallel runs are recorded automatically.
+        See thesdk.profiler.
+
+        Example::
+
+            with self.profile('postprocess'):
+                self.calculate_something()
+
+        """
+        return profiler.region(name,self)
+
+    @classmethod
+    def profile_report(cls,reset=False):
+        '''Prints the count, total, mean and maximum time of the profiled
+        regions.
+
+        Parameters
+        ----------
+        reset : bool, False
+            Discard the collected statistics after printing.
+
+        '''
+        print(profiler.report())
+        if reset:
+            profiler.reset()
+
+    @classmethod
+    def profile_export(cls,filename,format='json'):
+        '''Writes the profile to filename.
+
+        Parameters
+        ----------
+        filename : str
+        format : str, 'json'
+            'json' for the aggregated statistics of the regions,
+            'chrome' for the individual calls in Chrome trace format.
+
+        '''
+        profiler.export(filename,format)
+
     @cl.contextmanager
     def silence(self,show_error=True,debug=False):
         '''
@@ -598,6 +779,7 @@ class thesdk(metaclass=abc.ABCMeta):
     def queue(self,value):
         self._queue = value
 
+    @profiled()
     def run_parallel(self, **kwargs):
         """Run instances in parallel and collect results
 
@@ -631,49 +813,234 @@ class thesdk(metaclass=abc.ABCMeta):
                     List of instances you want to simulate
                  method: str
                     Method called for each instance (default: run)
-                 max_jobs: int
+                 max_jobs: int or str
                     Maximum number of concurrent jobs. Unlimited by default.
+                    'auto' adapts the number of concurrent jobs of the
+                    'local' executor to the available CPUs and memory, see
+                    thesdk.parallel.Scheduler. In 'batch' mode, a new
+                    instance is then started as soon as the load allows,
+                    not in batches. Other executors run 'auto' unlimited.
+                 mem_per_job: int
+                    Estimated memory of an instance in bytes with
+                    max_jobs='auto'. Needed for instances whose memory is
+                    allocated by subprocesses, e.g. external simulators.
+                    By default the memory is estimated from the observed
+                    worker processes.
+                 mem_reserve: float
+                    Fraction of the total memory kept free with
+                    max_jobs='auto'. Default 0.1.
+                 mode: str
+                    'batch' (default) | 'pool'.
+                    In 'batch' mode, a new process is started for each
+                    instance, and the instances are run in batches of max_jobs.
+                    In 'pool' mode, max_jobs worker processes are started once,
+                    and a new instance is dispatched to a worker as soon as it
+                    becomes free. Results are collected in completion order.
+                    In 'pool' mode, instances run one after another in the same
+                    process, so they must not rely on a fresh process state.
+                 transport: str
+                    'pickle' (default) | 'shm'.
+                    With 'shm', NumPy arrays in the returned dictionary, also
+                    the Data of returned IOs, are passed through shared memory
+                    files instead of pickling them through the queue. The
+                    results are received as copy-on-write memory maps.
+                 shm_threshold: int
+                    Minimum size in bytes of arrays passed through shared
+                    memory with 'shm' transport. Default 1048576.
+                 executor: str or thesdk.parallel.Executor
+                    'local' (default) | 'lsf' | 'socket' | Executor instance.
+                    'local' runs the instances in local processes according
+                    to mode and transport.
+                    'lsf' submits each instance as a batch job with the
+                    LSFSUBMISSION command of TheSDK.config, see
+                    thesdk.parallel.BatchExecutor.
+                    'socket' sends the instances to the socket workers
+                    given with `workers`, see thesdk.parallel.SocketExecutor.
+                    With the 'lsf' and 'socket' executors, the classes of the
+                    instances must be importable in the worker processes, and
+                    mode and transport have no effect.
+                 workers: list(str)
+                    Addresses 'host:port' of the socket workers for the
+                    'socket' executor.
+                 timeout: float
+                    Maximum run time of an instance in seconds with the
+                    'local' executor. The worker process of an instance
+                    exceeding it is killed. Unlimited by default.
+                 retries: int
+                    Number of times an instance that timed out, or whose
+                    worker process exited without result, is run again with
+                    the 'local' executor. Instances returning an empty
+                    dictionary, e.g. after a fatal error, are not retried.
+                    Default 0.
+                 status_file: str
+                    File to which the progress of the run is written as
+                    JSON with the 'local' executor: start and end times of
+                    the instances, throughput, ETA, idle time of the job
+                    slots and size of the received results. See
+                    thesdk.parallel.Telemetry.
+                 status_callback: callable
+                    Called with the progress dictionary of status_file.
+                 status_interval: float
+                    Minimum interval in seconds of the progress updates.
+                    Default 5.0.
+
+        Results of all executors are saved to the instances in the same way.
+        A failing instance does not stop the run, the other instances are
+        run to completion.
+
+        Returns
+        -------
+        list(thesdk.parallel.JobReport)
+            Status, number of attempts and duration of each instance.
         """
 
         duts=kwargs.get('duts')
         method=kwargs.get('method','run')
         max_jobs=kwargs.get('max_jobs',None)
+        mode=kwargs.get('mode','batch')
+        transport=kwargs.get('transport','pickle')
+        if transport == 'shm':
+            threshold=kwargs.get('shm_threshold',1048576)
+        elif transport == 'pickle':
+            threshold=None
+        else:
+            self.print_log(type='F', msg='Parallel run transport %s not supported.' %(transport))
         if max_jobs is None:
             max_jobs = len(duts)
-        nbatch = int(np.ceil(len(duts)/max_jobs))
-        for j in range(nbatch):
-            dutrange = range(j*max_jobs,(j+1)*max_jobs)
-            if dutrange.stop > len(duts):
-                dutrange = range(j*max_jobs,len(duts))
-            que=[]
-            proc=[]
-            for i in dutrange:
-                self.print_log(type='I', msg='Starting parallel run %d/%d' % (i+1,len(duts)))
-                que.append(multiprocessing.Queue())
-                proc.append(multiprocessing.Process(target=getattr(duts[i],method)))
-                duts[i].par = True
-                duts[i].queue = que[-1]
-                proc[-1].start()
-            n=0
-            for i in dutrange:
-                ret_dict=que[n].get() # returned dictionary
-                if ret_dict:
-                    self.print_log(type='I', msg='Saving results from parallel run of %s' %(duts[i]))
-                    for key,value in ret_dict.items():
-                        if key in duts[i].IOS.Members:
-                            duts[i].IOS.Members[key] = value
-                        elif hasattr(duts[i],key):
-                            setattr(duts[i],key,value)
-                        else:
-                            duts[i].extracts.Members[key] = value
+        elif max_jobs != 'auto' and not isinstance(max_jobs,int):
+            self.print_log(type='F', msg='Parallel run max_jobs %s not supported.' %(max_jobs))
+        if mode not in [ 'batch', 'pool' ]:
+            self.print_log(type='F', msg='Parallel run mode %s not supported.' %(mode))
+        executor=kwargs.get('executor','local')
+        if executor == 'local':
+            scheduler=None
+            if max_jobs == 'auto':
+                scheduler = parallel.Scheduler(None,kwargs.get('mem_per_job',None),
+                        kwargs.get('mem_reserve',0.1))
+                scheduler.max_jobs = max_jobs = max(1,min(scheduler.max_jobs,len(duts)))
+            executor = parallel.LocalExecutor(mode,threshold,
+                    kwargs.get('timeout',None),kwargs.get('retries',0),
+                    status_file=kwargs.get('status_file',None),
+                    callback=kwargs.get('status_callback',None),
+                    status_interval=kwargs.get('status_interval',5.0),
+                    scheduler=scheduler)
+        elif max_jobs == 'auto':
+            max_jobs = len(duts)
+        if executor == 'lsf':
+            if not self.has_lsf:
+                self.print_log(type='F', msg='LSFSUBMISSION not defined in %s.' %(thesdk.CONFIGFILE))
+            executor = parallel.BatchExecutor()
+        elif executor == 'socket':
+            executor = parallel.SocketExecutor(kwargs.get('workers',[]))
+        elif not isinstance(executor,parallel.Executor):
+            self.print_log(type='F', msg='Parallel run executor %s not supported.' %(executor))
+        return executor.run(self,duts,method,max_jobs)
+
+    def run_async(self, **kwargs):
+        """Run instances concurrently in this process with asyncio.
+
+        Lightweight alternative to run_parallel for instances that mostly
+        wait for external simulator processes. The method of each instance
+        may be a coroutine, which launches the simulator with
+        `run_command` and offloads blocking work, e.g. iofile processing,
+        with `run_in_thread`. Methods that are not coroutines are run in a
+        thread pool. Results remain in the instances, no queue is used.
+        See thesdk.aio.
+
+        Can not be called from a running event loop, use
+        `await self.gather_async(...)` there.
+
+        Parameters
+        ----------
+         **kwargs:
+                 duts: list
+                    List of instances you want to simulate
+                 method: str
+                    Method called for each instance (default: run)
+                 max_jobs: int
+                    Maximum number of concurrent subprocesses started
+                    with run_command. Unlimited by default.
+                 max_threads: int
+                    Size of the thread pool.
+
+        Returns
+        -------
+        list(bool)
+            False for the instances that failed.
+
+        """
+        return asyncio.run(self.gather_async(**kwargs))
+
+    async def gather_async(self, **kwargs):
+        """Coroutine of `run_async`, for use in a running event loop.
+
+        """
+        duts=kwargs.get('duts')
+        results=await aio.gather(duts,kwargs.get('method','run'),
+                kwargs.get('max_jobs',None),kwargs.get('max_threads',None))
+        for i,success in enumerate(results):
+            if not success:
+                self.print_log(type='W',msg='Async run %d/%d failed (with name: %s).'
+                        % (i+1, len(duts), duts[i].runname))
+        return results
+
+    async def run_command(self,command,**kwargs):
+        """Coroutine running command in a subprocess, within the limit
+        of concurrent subprocesses of `run_async`.
+
+        Parameters
+        ----------
+        command : str or list(str)
+            Shell command, or program and arguments.
+        **kwargs :
+            cwd, env and capture, see thesdk.aio.AsyncRunner.run_command.
+
+        Returns
+        -------
+        subprocess.CompletedProcess
+
+        Example
+        -------
+        await self.run_command('ngspice -b %s' % self.spicesimpath)
+
+        """
+        self.print_log(type='I',msg='Running external command %s' % (command,))
+        result=await aio.current().run_command(command,**kwargs)
+        if result.returncode != 0:
+            self.print_log(type='W',msg='Command %s exited with %d' % (command,result.returncode))
+        return result
+
+    async def run_in_thread(self,func,*args,**kwargs):
+        """Coroutine running func(*args,**kwargs) in the thread pool
+        of `run_async`, and returning its value.
+
+        Example
+        -------
+        await self.run_in_thread(self.write_iofile_bundle)
+
+        """
+        return await aio.current().to_thread(func,*args,**kwargs)
+
+    def _save_parallel_result(self,duts,i,ret_dict):
+        """Saves the dictionary returned by parallel run of duts[i] to
+        the IOS, attributes or extracts of duts[i].
+
+        """
+        if ret_dict:
+            self.print_log(type='I', msg='Saving results from parallel run of %s' %(duts[i]))
+            for key,value in ret_dict.items():
+                if key in duts[i].IOS.Members:
+                    duts[i].IOS.Members[key] = value
+                elif hasattr(duts[i],key):
+                    setattr(duts[i],key,value)
                 else:
-                    if duts[i].load_state == '':
-                        name = duts[i].runname
-                    else:
-                        name = duts[i].load_state
-                    self.print_log(type='W',msg='Parallel run %d/%d failed (with name: %s). Returned dict was empty!' % (i+1, len(duts), name))
-                proc[n].join()
-                n+=1
+                    duts[i].extracts.Members[key] = value
+        else:
+            if duts[i].load_state == '':
+                name = duts[i].runname
+            else:
+                name = duts[i].load_state
+            self.print_log(type='W',msg='Parallel run %d/%d failed (with name: %s). Returned dict was empty!' % (i+1, len(duts), name))
 
     @property
     def IOS(self):
@@ -753,7 +1120,9 @@ class thesdk(metaclass=abc.ABCMeta):
 
         Automatically generated name for the simulation.
 
-        Formatted as timestamp_randomtag, i.e. '20201002103638_tmpdbw11nr4'.
+        Formatted as timestamp_tag, i.e. '20201002103638_tmp4kq7z01b3c0'.
+        The tag is unique across processes without filesystem calls, see
+        thesdk.runid.
         Can be overridden by assigning self.runname = 'myname'.
 
         Example::
@@ -764,8 +1133,7 @@ class thesdk(metaclass=abc.ABCMeta):
 
         """
         if not hasattr(self,'_runname'):
-            self._runname='%s_%s' % \
-                    (datetime.now().strftime('%Y%m%d%H%M%S'),os.path.basename(tempfile.mkstemp()[1]))
+            self._runname=runid.new()
         return self._runname
     @runname.setter
     def runname(self,value):
@@ -839,6 +1207,9 @@ class thesdk(metaclass=abc.ABCMeta):
         List available results by providing any non-existent `runname`::
 
             self.load_state = 'this_does_not_exist'
+
+        The latest state and the listing are looked up from the state
+        catalogue of `statepath`, see `find_states`.
         """
         if not hasattr(self,'_load_state'):
             self._load_state=''
@@ -862,64 +1233,342 @@ class thesdk(metaclass=abc.ABCMeta):
     def load_state_full(self,value):
         self._load_state_full = value
 
+    @property
+    def load_state_ios(self):
+        """List[str] | None (default)
+
+        Names of the IOs to load from a state saved with state_format 'npy'.
+        All IOs are loaded if None. Ignored for state_format 'pickle'.
+        """
+        if not hasattr(self,'_load_state_ios'):
+            self._load_state_ios = None
+        return self._load_state_ios
+    @load_state_ios.setter
+    def load_state_ios(self,value):
+        self._load_state_ios = value
+
+    @property
+    def state_format(self):
+        """'pickle' (default) | 'npy'
+
+        Format of the saved state.
+
+        'pickle'
+            The entity is pickled as a whole to state.pickle.
+        'npy'
+            NumPy arrays of the entity, e.g. the Data of IOS and arrays
+            in extracts, are stored as separate .npy files and memory-mapped
+            when loaded. With load_state_full False, only the IOs and
+            extracts are loaded, without unpickling the entity.
+            See thesdk.state.
+
+        Loading detects the format of the stored state automatically.
+        """
+        if not hasattr(self,'_state_format'):
+            self._state_format = 'pickle'
+        return self._state_format
+    @state_format.setter
+    def state_format(self,value):
+        if value not in [ 'pickle', 'npy' ]:
+            self.print_log(type='F', msg='State format %s not supported.' %(value))
+        self._state_format = value
+
+    @property
+    def save_state_compression(self):
+        """None (default) | 'auto' | 'zstd' | 'lz4' | 'zlib'
+
+        Compression of the saved state. With state_format 'npy' the array
+        payloads are compressed in chunks, with 'pickle' the whole pickle.
+        'auto' selects the first available of 'zstd' (requires module
+        zstandard), 'lz4' (requires module lz4) and 'zlib'. If the selected
+        codec is not installed, 'zlib' is used.
+        """
+        if not hasattr(self,'_save_state_compression'):
+            self._save_state_compression = None
+        return self._save_state_compression
+    @save_state_compression.setter
+    def save_state_compression(self,value):
+        if value not in [ None, False, 'auto', 'zstd', 'lz4', 'zlib' ]:
+            self.print_log(type='F', msg='State compression %s not supported.' %(value))
+        self._save_state_compression = value
+
+    @property
+    def save_state_async(self):
+        """True | False (default)
+
+        Write the state in a background thread. `_write_state` returns
+        immediately, and the next simulation can start while the state is
+        written. Call `wait_for_state` before modifying the entity or its
+        IOs. Pending writes are completed before the process exits.
+        """
+        if not hasattr(self,'_save_state_async'):
+            self._save_state_async = False
+        return self._save_state_async
+    @save_state_async.setter
+    def save_state_async(self,value):
+        self._save_state_async = value
+
+    def wait_for_state(self):
+        """Wait for the background write of the state to complete.
+        See `save_state_async`.
+
+        """
+        thread = self.__dict__.pop('_state_thread',None)
+        if thread is not None:
+            thread.join()
+
     def _write_state(self):
         """Write the entity state to a binary file.
 
         This should be called after the simulation has finished.
+        If save_state_async is True, the state is written in a background
+        thread.
         """
-        pathname = '%s/%s' % (self.statepath,self.runname)
+        cache_key = self.__dict__.get('_cache_key')
+        if cache_key is not None:
+            self._cache_saved = True
+        if self.save_state_async:
+            self.wait_for_state()
+            self._state_thread = threading.Thread(target=self._write_state_now,
+                    args=(cache_key,), name='thesdk-state-%s' % self.runname)
+            self._state_thread.start()
+        else:
+            self._write_state_now(cache_key)
+
+    @profiled('_write_state')
+    def _write_state_now(self,cache_key=None):
+        compression = self.save_state_compression
+        if compression:
+            try:
+                compression = state.codec(compression)[0]
+            except ImportError:
+                self.print_log(type='W',msg='Compression %s not available, using zlib.' % compression)
+                compression = 'zlib'
+        # The state is written to a new directory that replaces statedir,
+        # as arrays of an existing state may be memory-mapped, e.g. by the
+        # entity itself after a cache hit, and must not be overwritten.
+        tmpdir = '%s.%s' % (self.statedir,runid.tag())
         try:
-            if not (os.path.exists(self.statedir)):
-                os.makedirs(self.statedir)
+            fsstats.makedirs(tmpdir)
         except:
-            self.print_log(type='E',msg='Failed to create %s' % self.statedir)
+            self.print_log(type='E',msg='Failed to create %s' % tmpdir)
         try:
-            with open('%s/state.pickle' % self.statedir,'wb') as f:
-                pickle.dump(self,f)
+            if self.state_format == 'npy':
+                StateStore(tmpdir,compression=compression).write(self)
+            else:
+                state.dump_pickle(self,'%s/state.pickle' % tmpdir,compression)
+            state.replace_dir(tmpdir,self.statedir)
             self.print_log(type='I',msg='Saving state to %s' % self.statedir)
         except:
             self.print_log(type='E',msg=traceback.format_exc())
             self.print_log(type='E',msg='Failed saving state to %s' % self.statedir)
+            shutil.rmtree(tmpdir,ignore_errors=True)
+            return
+        try:
+            Catalogue(self.statepath).add(self)
+        except:
+            self.print_log(type='W',msg=traceback.format_exc())
+            self.print_log(type='W',msg='Failed adding state to catalogue of %s' % self.statepath)
+        if cache_key is not None:
+            try:
+                evicted = ResultCache(self.statepath,self.cache_size).store(cache_key,self.runname)
+                for runname in evicted:
+                    self.print_log(type='I',msg='Evicted cached state %s' % runname)
+            except:
+                self.print_log(type='W',msg=traceback.format_exc())
+                self.print_log(type='W',msg='Failed adding state to cache of %s' % self.statepath)
+
+    def find_states(self,**kwargs):
+        """Search the state catalogue of statepath by parameter values.
+
+        Parameters
+        ----------
+        **kwargs :
+            Values of the properties in proplist, and 'model', that the
+            states must match.
+
+        Returns
+        -------
+        list(dict)
+            Catalogue records of the matching states, oldest first. The
+            runname of a record can be given to load_state.
+            See thesdk.state.Catalogue.
+
+        Example
+        -------
+        self.find_states(model='py',Rs=100e6)
+
+        """
+        return Catalogue(self.statepath).find(**kwargs)
+
+    @property
+    def cache_inputs(self):
+        """List of strings or None (default)
+
+        Names of the IOs whose Data is included in the cache key, see
+        `run_cached`. If None, all IOs with Data other than None at the
+        time of the call are included.
+        """
+        if not hasattr(self,'_cache_inputs'):
+            self._cache_inputs = None
+        return self._cache_inputs
+    @cache_inputs.setter
+    def cache_inputs(self,value):
+        self._cache_inputs = value
+
+    @property
+    def cache_size(self):
+        """Integer or None (default)
+
+        Maximum total size in bytes of the cached states under `statepath`.
+        When exceeded, the least recently used cached states are removed.
+        Unlimited if None.
+        """
+        if not hasattr(self,'_cache_size'):
+            self._cache_size = None
+        return self._cache_size
+    @cache_size.setter
+    def cache_size(self,value):
+        self._cache_size = value
+
+    def cache_key(self,method='run'):
+        """Key of the result cache for the current parameters and inputs.
+
+        Hash of the class, `model`, `method`, values of the properties in
+        `proplist` and Data of the IOs in `cache_inputs`. See thesdk.cache.
+
+        Parameters
+        ----------
+        method : str, 'run'
+            Name of the method executing the simulation.
+        """
+        inputs = self.cache_inputs
+        if inputs is None:
+            inputs = [ name for name,io in self.IOS.Members.items() if io.Data is not None ]
+        return cache.key(self,inputs,method)
+
+    def run_cached(self,method='run'):
+        """Run the simulation through the result cache.
+
+        If a state with the same `cache_key` is found under `statepath`, it
+        is loaded with `_read_state` and the simulation is not executed.
+        If the key can not be computed, i.e. a property or input has a type
+        without a canonical form, `method` is called without the cache.
+        Otherwise `method` is called with `save_state` enabled, and the
+        saved state is added to the cache. If the method does not save the
+        state, it is saved after the method returns.
 
+        Parameters
+        ----------
+        method : str, 'run'
+            Name of the method executing the simulation.
+
+        Returns
+        -------
+        bool
+            True if the results were loaded from the cache.
+
+        """
+        try:
+            key = self.cache_key(method)
+        except TypeError as error:
+            self.print_log(type='W',msg='Not cacheable, %s. Running %s without cache.' % (error,method))
+            getattr(self,method)()
+            return False
+        runname = ResultCache(self.statepath,self.cache_size).lookup(key)
+        if runname is not None:
+            self.print_log(type='I',msg='Cache hit %s, loading state %s' % (key[:16],runname))
+            load_state = self.load_state
+            self.load_state = runname
+            try:
+                self._read_state()
+            finally:
+                self.load_state = load_state
+            return True
+        self.print_log(type='I',msg='Cache miss %s, running %s' % (key[:16],method))
+        save_state = self.save_state
+        self.save_state = True
+        self._cache_key = key
+        self._cache_saved = False
+        try:
+            getattr(self,method)()
+            if not self._cache_saved:
+                self._write_state()
+        finally:
+            self.save_state = save_state
+            del self._cache_key
+            del self._cache_saved
+        return False
+
+    @profiled()
     def _read_state(self):
         """Read the entity state from a binary file.
 
         """
         self.runname = self.load_state
+        catalogue = Catalogue(self.statepath)
         if self.runname == 'latest' or self.runname == 'last':
-            results = glob.glob(self.statepath+'/*')
-            latest = max(results, key=os.path.getctime)
-            self.runname = latest.split('/')[-1]
+            latest = catalogue.latest()
+            if latest is None:
+                # States saved without catalogue
+                results = [ path for path in fsstats.glob(self.statepath+'/*') if fsstats.isdir(path) ]
+                latest = max(results, key=os.path.getctime).split('/')[-1]
+            self.runname = latest
         pathname = '%s/%s' % (self.statepath,self.runname)
-        if not os.path.exists(pathname):
+        if not fsstats.exists(pathname):
             self.print_log(type='E',msg='Existing results not found in %s' % pathname)
-            existing = os.listdir(self.statepath)
+            if catalogue.exists():
+                existing = [ record['runname'] for record in catalogue.records() ]
+            else:
+                existing = fsstats.listdir(self.statepath)
             self.print_log(type='I',msg='Found results:')
             for f in existing:
                 self.print_log(type='I',msg='%s' % f)
         try:
             self.print_log(type='I',msg='Loading state from %s' % pathname)
-            with open('%s/state.pickle' % pathname,'rb') as f:
-                obj = pickle.load(f)
-                for name,val in obj.__dict__.items():
-                    # For a bundle, assign the Data fields to preserve pointers
-                    if name == '_IOS' and type(val).__name__ == 'Bundle':
-                        for ioname,ioval in val.Members.items():
-                            self.print_log(type='D',msg='Assigning data to %s at %s' % \
-                                    (ioname,hex(id(self.__dict__[name].Members[ioname]))))
-                            self.__dict__[name].Members[ioname].Data = ioval.Data
-                    elif self.load_state_full or name == '_extracts':
-                        self.print_log(type='D',msg='Loading %s' % name)
-                        self.__dict__[name] = val
+            if StateStore.exists(pathname):
+                store = StateStore(pathname)
+                if self.load_state_full:
+                    self._assign_state(store.load_entity())
+                else:
+                    for ioname,data in store.load_ios(self.load_state_ios).items():
+                        self.print_log(type='D',msg=lambda: 'Assigning data to %s at %s' % \
+                                (ioname,hex(id(self.IOS.Members[ioname]))))
+                        self.IOS.Members[ioname].Data = data
+                    self.print_log(type='D',msg='Loading %s',args=('_extracts',))
+                    self._extracts = store.load_extracts()
+            else:
+                self._assign_state(state.load_pickle('%s/state.pickle' % pathname))
         except:
             self.print_log(type='W',msg=traceback.format_exc())
             self.print_log(type='F',msg='Failed loading state from %s' % pathname)
 
+    def _assign_state(self,obj):
+        """Assign the state of a loaded entity obj to self.
+
+        Data of IOS is always assigned, extracts always replaced. Other
+        attributes are replaced if load_state_full is True.
+        """
+        for name,val in obj.__dict__.items():
+            # For a bundle, assign the Data fields to preserve pointers
+            if name == '_IOS' and type(val).__name__ == 'Bundle':
+                for ioname,ioval in val.Members.items():
+                    self.print_log(type='D',msg=lambda: 'Assigning data to %s at %s' % \
+                            (ioname,hex(id(self.__dict__[name].Members[ioname]))))
+                    self.__dict__[name].Members[ioname].Data = ioval.Data
+            elif self.load_state_full or name == '_extracts':
+                self.print_log(type='D',msg='Loading %s',args=(name,))
+                self.__dict__[name] = val
+
     def __getstate__(self):
         state=self.__dict__.copy()
         for item in self.pickle_excludes:
             if item in state:
                 del state[item]
+        # Background state write in progress, result cache bookkeeping and
+        # simpath cache, which is not valid in other processes
+        for item in [ '_state_thread', '_cache_key', '_cache_saved', '_simpath_key' ]:
+            state.pop(item,None)
         return state
     def __setstate__(self,state):
         for item in self.pickle_excludes:
@@ -960,6 +1609,104 @@ class thesdk(metaclass=abc.ABCMeta):
                 else:
                     val.remove()
 
+    def sync_iofile_bundle(self):
+        """Method to synchronize all written files of iofile bundle to disk
+
+        Files written with durability 'batch' are not synchronized when
+        written. This method synchronizes the pending files in one pass
+        after all of them have been written, see iofile.sync.
+        """
+        pending=[ val for val in self.iofile_bundle.Members.values()
+                if getattr(val,'sync_pending',False) ]
+        if len(pending) > 0:
+            self.print_log(type='D', msg='Synchronizing %d iofiles to disk' %(len(pending)))
+            for val in pending:
+                val.sync()
+
+    def _map_iofile_bundle(self,method,names,max_workers,**kwargs):
+        """Calls 'method' of the given members of iofile bundle in a thread pool.
+
+        Returns
+        -------
+        dict
+            Execution time of each call in seconds, keyed by member name.
+
+        """
+        # Resolve file names before threading, simpath may create directories
+        for name in names:
+            self.iofile_bundle.Members[name].file
+
+        def timed(name):
+            start = time.perf_counter()
+            getattr(self.iofile_bundle.Members[name],method)(**kwargs)
+            return time.perf_counter()-start
+
+        timing={}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures={ executor.submit(timed,name) : name for name in names }
+            for future in concurrent.futures.as_completed(futures):
+                timing[futures[future]]=future.result()
+                self.print_log(type='D', msg="Finished %s of %s in %.03f s."
+                        %(method,futures[future],timing[futures[future]]))
+        return timing
+
+    def write_iofile_bundle(self,**kwargs):
+        """Method to write files of iofile bundle in parallel
+
+        The files are formatted and written in a thread pool. Pending
+        files written with durability 'batch' are synchronized after
+        writing with sync_iofile_bundle.
+
+        Parameters
+        ----------
+         **kwargs:
+                 names: list(str)
+                    Names of the members to write. Default: members with dir 'in'.
+                 max_workers: int
+                    Maximum number of threads. Default: ThreadPoolExecutor default.
+
+                 Other keyword arguments are passed to the write method of the members.
+
+        Returns
+        -------
+        dict
+            Time used for writing each file in seconds, keyed by member name.
+
+        """
+        names=kwargs.pop('names',[ name for name, val in self.iofile_bundle.Members.items()
+                if getattr(val,'dir',None) == 'in' ])
+        max_workers=kwargs.pop('max_workers',None)
+        timing=self._map_iofile_bundle('write',names,max_workers,**kwargs)
+        self.sync_iofile_bundle()
+        return timing
+
+    def read_iofile_bundle(self,**kwargs):
+        """Method to read files of iofile bundle in parallel
+
+        The files are read and parsed in a thread pool. NumPy and the
+        pandas C parser release the GIL while parsing.
+
+        Parameters
+        ----------
+         **kwargs:
+                 names: list(str)
+                    Names of the members to read. Default: members with dir 'out'.
+                 max_workers: int
+                    Maximum number of threads. Default: ThreadPoolExecutor default.
+
+                 Other keyword arguments are passed to the read method of the members.
+
+        Returns
+        -------
+        dict
+            Time used for reading each file in seconds, keyed by member name.
+
+        """
+        names=kwargs.pop('names',[ name for name, val in self.iofile_bundle.Members.items()
+                if getattr(val,'dir',None) == 'out' ])
+        max_workers=kwargs.pop('max_workers',None)
+        return self._map_iofile_bundle('read',names,max_workers,**kwargs)
+
 class IO(thesdk):
     ''' TheSyDeKick IO class. Child of thesdk to utilize logging method.
 
@@ -1023,4 +1770,7 @@ class IO(thesdk):
     def __setstate__(self,state):
         self.__dict__.update(state)
 
-
+# Resolve MODULEPATHS on the first import not found otherwise
+if not any(isinstance(finder,bootstrap.EntityFinder) for finder in sys.meta_path):
+    sys.meta_path.append(bootstrap.EntityFinder(lambda: thesdk.MODULEPATHS))
+bootstrap.record('import',time.perf_counter()-_import_start)
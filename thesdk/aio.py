@@ -0,0 +1,180 @@
+"""
+===
+Aio
+===
+
+Asyncio runner of thesdk, see thesdk.run_async.
+
+Entities wrapping external simulators spend most of their time waiting
+for the simulator processes. With the asyncio runner, the run method of
+an entity can be a coroutine, and the instances run concurrently in a
+single Python process. Simulator processes are launched with
+thesdk.run_command, limited to max_jobs concurrent processes, and
+blocking Python work, e.g. iofile reading and writing, is offloaded to a
+thread pool with thesdk.run_in_thread.
+
+Methods that are not coroutines are run in the thread pool.
+
+Example::
+
+    class mysim(thesdk):
+        async def run(self):
+            await self.run_in_thread(self.write_iofile_bundle)
+            await self.run_command('simulator %s' %(self.simpath))
+            await self.run_in_thread(self.read_iofile_bundle)
+
+    top.run_async(duts=[ mysim() for _ in range(100) ], max_jobs=8)
+
+"""
+import asyncio
+import inspect
+import functools
+import traceback
+import contextlib
+import contextvars
+import subprocess
+import concurrent.futures
+
+_runner=contextvars.ContextVar('thesdk_runner',default=None)
+
+class AsyncRunner:
+    '''Limits of the concurrent work of an asyncio run.
+
+    Parameters
+    ----------
+    max_jobs: int, None
+        Maximum number of concurrent subprocesses. Unlimited if None.
+    max_threads: int, None
+        Size of the thread pool. Default of ThreadPoolExecutor if None.
+    pool: bool, True
+        Create an own thread pool. Without it, the default executor of
+        the event loop is used through asyncio.to_thread, and nothing
+        needs to be closed.
+
+    '''
+    def __init__(self,max_jobs=None,max_threads=None,pool=True):
+        self.max_jobs=max_jobs
+        self._semaphore=None
+        self._executor=None
+        if pool:
+            self._executor=concurrent.futures.ThreadPoolExecutor(max_threads,
+                    thread_name_prefix='thesdk-aio')
+
+    @property
+    def semaphore(self):
+        '''asyncio.Semaphore limiting the subprocesses, created in the running loop.
+
+        '''
+        if self._semaphore is None and self.max_jobs is not None:
+            self._semaphore=asyncio.Semaphore(self.max_jobs)
+        return self._semaphore
+
+    async def run_command(self,command,cwd=None,env=None,capture=False):
+        '''Runs command in a subprocess and waits for it to finish.
+
+        Parameters
+        ----------
+        command: str or list(str)
+            Shell command, or program and arguments.
+        cwd: str, None
+            Working directory.
+        env: dict, None
+            Environment. Inherited if None.
+        capture: bool, False
+            Capture stdout and stderr instead of passing them through.
+
+        Returns
+        -------
+        subprocess.CompletedProcess
+
+        '''
+        pipe=asyncio.subprocess.PIPE if capture else None
+        async with (self.semaphore or contextlib.nullcontext()):
+            if isinstance(command,str):
+                proc=await asyncio.create_subprocess_shell(command,cwd=cwd,env=env,
+                        stdout=pipe,stderr=pipe)
+            else:
+                proc=await asyncio.create_subprocess_exec(*command,cwd=cwd,env=env,
+                        stdout=pipe,stderr=pipe)
+            stdout,stderr=await proc.communicate()
+        return subprocess.CompletedProcess(command,proc.returncode,stdout,stderr)
+
+    async def to_thread(self,func,*args,**kwargs):
+        '''Runs func(*args,**kwargs) in the thread pool and returns its value.
+
+        '''
+        if self._executor is None:
+            return await asyncio.to_thread(func,*args,**kwargs)
+        loop=asyncio.get_running_loop()
+        context=contextvars.copy_context()
+        return await loop.run_in_executor(self._executor,
+                functools.partial(context.run,func,*args,**kwargs))
+
+    def close(self):
+        '''Shuts down the thread pool, waiting for the running calls.
+        Blocks, see aclose in a coroutine.
+
+        '''
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    async def aclose(self):
+        '''Shuts down the thread pool without blocking the event loop.
+
+        '''
+        await asyncio.get_running_loop().run_in_executor(None,self.close)
+
+# Runner outside of gather, without limits and without an own thread pool
+_default=AsyncRunner(pool=False)
+
+def current():
+    '''Runner of the current asyncio run. Outside of an asyncio run of
+    thesdk, a runner without limits using the default executor of the
+    event loop.
+
+    '''
+    runner=_runner.get()
+    if runner is None:
+        return _default
+    return runner
+
+async def run_dut(runner,dut,method):
+    '''Runs method of dut. Coroutines are awaited, other methods are run
+    in the thread pool of runner.
+
+    Returns
+    -------
+    bool
+        False if the method raised an exception or a fatal error.
+
+    '''
+    func=getattr(dut,method)
+    try:
+        if inspect.iscoroutinefunction(func):
+            await func()
+        else:
+            await runner.to_thread(func)
+        return True
+    except SystemExit:
+        # Fatal error in print_log
+        return False
+    except Exception:
+        traceback.print_exc()
+        return False
+
+async def gather(duts,method='run',max_jobs=None,max_threads=None):
+    '''Runs method of all duts concurrently.
+
+    Returns
+    -------
+    list(bool)
+        Success of each dut, see run_dut.
+
+    '''
+    runner=AsyncRunner(max_jobs,max_threads)
+    token=_runner.set(runner)
+    try:
+        return await asyncio.gather(*[ run_dut(runner,dut,method) for dut in duts ])
+    finally:
+        _runner.reset(token)
+        await runner.aclose()
@@ -0,0 +1,155 @@
+"""
+=========
+Bootstrap
+=========
+
+Lazy and cached initialization of the class attributes of thesdk.
+
+The module paths under HOME/Entities and the global parameters of
+TheSDK.config (see thesdk.config) are resolved on first access instead
+of at import time.
+Discovered module paths are memoized on disk keyed on the modification
+times of the Entities directory, of the entity directories <name> and
+of their module directories <name>/<name>.
+
+Time spent in each bootstrap phase is recorded, see report.
+
+"""
+import os
+import json
+import time
+import hashlib
+import importlib.abc
+import importlib.machinery
+
+# Time spent in bootstrap phases in seconds, in order of execution
+profile={}
+
+def record(phase,seconds):
+    '''Adds seconds to the time spent in phase.
+
+    '''
+    profile[phase]=profile.get(phase,0.0)+seconds
+
+def report():
+    '''Returns the bootstrap profile as printable text.
+
+    '''
+    lines=[ 'Bootstrap profile:' ]
+    for phase,seconds in profile.items():
+        lines.append('    %-24s %8.3f ms' %(phase,seconds*1e3))
+    return '\n'.join(lines)
+
+class lazyclassattr:
+    '''Class attribute computed by the decorated function on first access.
+
+    The value replaces the descriptor in the owner class, so later accesses
+    are plain attribute lookups. Works for both class and instance access.
+
+    '''
+    def __init__(self,func):
+        self.func=func
+        self.__doc__=func.__doc__
+
+    def __set_name__(self,owner,name):
+        self.owner=owner
+        self.name=name
+
+    def __get__(self,obj,cls=None):
+        start=time.perf_counter()
+        value=self.func(self.owner)
+        setattr(self.owner,self.name,value)
+        record(self.name,time.perf_counter()-start)
+        return value
+
+def cachedir():
+    '''Directory for persistent caches of thesdk.
+
+    '''
+    return os.path.join(os.environ.get('XDG_CACHE_HOME',
+        os.path.join(os.path.expanduser('~'),'.cache')),'thesdk')
+
+def _cachefile(kind,path):
+    return os.path.join(cachedir(),'%s_%s.json'
+            %(kind,hashlib.sha1(path.encode('utf-8')).hexdigest()[:16]))
+
+def _mtimes(path):
+    '''Modification times of entity directory path and of its module
+    directory path/<name>, None if it does not exist.
+
+    '''
+    try:
+        inner=os.stat(os.path.join(path,os.path.basename(path))).st_mtime_ns
+    except OSError:
+        inner=None
+    return [ os.stat(path).st_mtime_ns, inner ]
+
+def _scan_modulepaths(root):
+    modulepaths=[]
+    mtimes={}
+    for entry in os.scandir(root):
+        if entry.is_dir():
+            # Adding or removing __init__.py changes the mtime of <name>/<name>
+            mtimes[entry.path]=_mtimes(entry.path)
+            if os.path.isfile(os.path.join(root, entry.name, entry.name, '__init__.py')):
+                modulepaths.append(entry.path)
+    return modulepaths, mtimes
+
+def modulepaths(home):
+    '''List of directories under home/Entities containing a
+    module of the same name, i.e. <home>/Entities/<name>/<name>/__init__.py.
+
+    Strategy:
+    1. iterate over paths starting from Entities directory
+    2. if Entities/<path> is not a file, check if Entities/<path>/<path>/__init__.py exists
+    3. If it does, it is a SDK module
+
+    The result is cached on disk and reused while the modification times
+    of Entities, of the directories in it and of their <name>/<name>
+    directories remain unchanged.
+
+    '''
+    root=os.path.join(home,'Entities')
+    try:
+        mtime=os.stat(root).st_mtime_ns
+    except OSError:
+        print("Entities directory %s not found" %(root))
+        return []
+    cachefile=_cachefile('modulepaths',root)
+    try:
+        with open(cachefile) as fid:
+            cached=json.load(fid)
+        if cached['mtime'] == mtime and all(_mtimes(path) == value
+                for path,value in cached['mtimes'].items()):
+            return cached['modulepaths']
+    except (OSError,ValueError,KeyError):
+        pass
+    paths,mtimes=_scan_modulepaths(root)
+    try:
+        os.makedirs(cachedir(),exist_ok=True)
+        tmpfile='%s.%d' %(cachefile,os.getpid())
+        with open(tmpfile,'w') as fid:
+            json.dump({ 'mtime' : mtime, 'modulepaths' : paths, 'mtimes' : mtimes },fid)
+        os.replace(tmpfile,cachefile)
+    except OSError:
+        pass
+    return paths
+
+class EntityFinder(importlib.abc.MetaPathFinder):
+    '''Meta path finder resolving the module paths on the first import
+    that is not found otherwise.
+
+    Parameters
+    ----------
+    resolve: callable
+        Returns the list of module paths. Called on first use.
+
+    '''
+    def __init__(self,resolve):
+        self.resolve=resolve
+
+    def find_spec(self,fullname,path,target=None):
+        if path is not None:
+            # Only top level modules are located from module paths
+            return None
+        return importlib.machinery.PathFinder.find_spec(fullname,self.resolve())
@@ -0,0 +1,225 @@
+"""
+=====
+Cache
+=====
+
+Content-addressed cache of simulation results, see thesdk.run_cached.
+
+The key of a simulation is a SHA-256 hash of the class and model of the
+entity, the name of the method running the simulation, the values of the properties in its proplist and the Data of its
+input IOs. The values are hashed in a canonical form, so that equal
+configurations give equal keys in every process. Entities with values of
+other types are not cached. The results are stored as regular saved states under the
+state path of the entity. The cache index, cache.json in the state path,
+maps the keys to the runnames of the states, with their sizes and the
+time of the last use.
+
+When the total size of the cached states exceeds the size limit, the
+least recently used states are removed.
+
+The index is updated under an exclusive lock on cache.lock, so that
+parallel runs sharing a state path can use the same cache.
+
+"""
+import os
+import json
+import time
+import fcntl
+import shutil
+import hashlib
+import contextlib
+import numpy as np
+
+def _canonical(value):
+    '''Canonical bytes of value, equal for equal values in any process.
+
+    Supported are None, bool, numbers, str, bytes, NumPy scalars and
+    arrays without objects, and lists, tuples, dicts, sets and frozensets
+    of these. Dicts and sets are sorted by the canonical bytes of their
+    items.
+
+    Raises
+    ------
+    TypeError
+        If value, or an item of it, is of another type.
+
+    '''
+    if value is None or isinstance(value,bool):
+        return repr(value).encode('utf-8')
+    if isinstance(value,(int,float,complex,np.number,np.bool_)):
+        if isinstance(value,(np.number,np.bool_)):
+            value=value.item()
+        # Tagged with the type, 1 and 1.0 give different keys
+        return ('%s:%r' %(type(value).__name__,value)).encode('utf-8')
+    if isinstance(value,str):
+        value=value.encode('utf-8')
+        return b'str:%d:' %(len(value))+value
+    if isinstance(value,bytes):
+        return b'bytes:%d:' %(len(value))+value
+    if isinstance(value,np.ndarray) and not value.dtype.hasobject:
+        data=np.ascontiguousarray(value).tobytes()
+        return ('ndarray:%s:%s:%d:' %(value.dtype.str,value.shape,len(data))).encode('utf-8')+data
+    if isinstance(value,(list,tuple)):
+        items=[ _canonical(item) for item in value ]
+    elif isinstance(value,dict):
+        items=sorted(_canonical(item) for item in value.items())
+    elif isinstance(value,(set,frozenset)):
+        items=sorted(_canonical(item) for item in value)
+    else:
+        raise TypeError('Type %s can not be used in a cache key' %(type(value).__name__))
+    return b''.join([ ('%s:%d:' %(type(value).__name__,len(items))).encode('utf-8') ]
+            +[ b'%d:' %(len(item))+item for item in items ])
+
+def _update(digest,value):
+    digest.update(_canonical(value))
+
+def key(entity,inputs,method='run'):
+    '''Cache key of a simulation of entity.
+
+    Parameters
+    ----------
+    entity: thesdk
+        The entity before the simulation.
+    inputs: list(str)
+        Names of the IOs of entity included in the key.
+    method: str, 'run'
+        Name of the method executing the simulation.
+
+    Returns
+    -------
+    str
+        Hexadecimal SHA-256 digest.
+
+    Raises
+    ------
+    TypeError
+        If a property or input has a type without a canonical form, see
+        _canonical. Such entities can not be cached, as e.g. pickles of
+        arbitrary objects differ between processes.
+
+    '''
+    digest=hashlib.sha256()
+    cls=type(entity)
+    digest.update(('%s.%s\n%s\n' %(cls.__module__,cls.__qualname__,entity.model)).encode('utf-8'))
+    digest.update(('method %s\n' %(method)).encode('utf-8'))
+    for prop in sorted(getattr(entity,'proplist',[])):
+        if hasattr(entity,prop):
+            digest.update(('prop %s\n' %(prop)).encode('utf-8'))
+            try:
+                _update(digest,getattr(entity,prop))
+            except TypeError as error:
+                raise TypeError('Property %s: %s' %(prop,error))
+    for name in sorted(inputs):
+        digest.update(('io %s\n' %(name)).encode('utf-8'))
+        try:
+            _update(digest,entity.IOS.Members[name].Data)
+        except TypeError as error:
+            raise TypeError('IO %s: %s' %(name,error))
+    return digest.hexdigest()
+
+def _size(path):
+    total=0
+    for root,_,files in os.walk(path):
+        for name in files:
+            try:
+                total+=os.path.getsize(os.path.join(root,name))
+            except OSError:
+                pass
+    return total
+
+class ResultCache:
+    '''Cache of the saved states under a state path.
+
+    Parameters
+    ----------
+    statepath: str
+        Directory of the states.
+    max_size: int, None
+        Maximum total size of the cached states in bytes. Unlimited if None.
+
+    '''
+    def __init__(self,statepath,max_size=None):
+        self.statepath=statepath
+        self.max_size=max_size
+        self.path=os.path.join(statepath,'cache.json')
+
+    @contextlib.contextmanager
+    def _index(self):
+        '''Locked index. Changes to the yielded dictionary are written back.
+
+        '''
+        os.makedirs(self.statepath,exist_ok=True)
+        with open(os.path.join(self.statepath,'cache.lock'),'a') as lock:
+            fcntl.flock(lock,fcntl.LOCK_EX)
+            try:
+                try:
+                    with open(self.path) as fid:
+                        index=json.load(fid)
+                except (OSError,ValueError):
+                    index={}
+                yield index
+                tmpfile='%s.%d' %(self.path,os.getpid())
+                with open(tmpfile,'w') as fid:
+                    json.dump(index,fid)
+                os.replace(tmpfile,self.path)
+            finally:
+                fcntl.flock(lock,fcntl.LOCK_UN)
+
+    def lookup(self,key):
+        '''Runname of the state cached with key, None if not cached.
+        Marks the state as used.
+
+        '''
+        with self._index() as index:
+            entry=index.get(key)
+            if entry is None:
+                return None
+            if not os.path.isdir(os.path.join(self.statepath,entry['runname'])):
+                # Removed outside of the cache
+                del index[key]
+                return None
+            entry['used']=time.time()
+            return entry['runname']
+
+    def store(self,key,runname):
+        '''Adds the saved state runname with key, and evicts the least
+        recently used states if the size limit is exceeded.
+
+        Returns
+        -------
+        list(str)
+            Runnames of the evicted states.
+
+        '''
+        size=_size(os.path.join(self.statepath,runname))
+        with self._index() as index:
+            # A state written again with the same runname replaces the old one
+            for old in [ old for old,entry in index.items() if entry['runname'] == runname ]:
+                del index[old]
+            index[key]={ 'runname' : runname, 'size' : size, 'used' : time.time() }
+            return self._evict(index,keep=key)
+
+    def _evict(self,index,keep=None):
+        evicted=[]
+        if self.max_size is None:
+            return evicted
+        total=sum(entry['size'] for entry in index.values())
+        for key in sorted(index,key=lambda key: index[key]['used']):
+            if total <= self.max_size:
+                break
+            if key == keep:
+                continue
+            entry=index.pop(key)
+            shutil.rmtree(os.path.join(self.statepath,entry['runname']),ignore_errors=True)
+            total-=entry['size']
+            evicted.append(entry['runname'])
+        return evicted
+
+    def clear(self):
+        '''Removes all cached states.
+
+        '''
+        with self._index() as index:
+            for entry in index.values():
+                shutil.rmtree(os.path.join(self.statepath,entry['runname']),ignore_errors=True)
+            index.clear()
@@ -0,0 +1,139 @@
+"""
+======
+Config
+======
+
+Parser of TheSDK.config.
+
+The configuration file is a shell script. All lines of form KEY=value,
+optionally preceded by 'export', are parsed to a dictionary in a single
+pass. Double quotes are removed from the values. The last definition of
+a key is used.
+
+The parsed result is cached on disk, keyed on the modification time and
+size of the file, so that spawned processes and later sessions do not
+need to parse the file again.
+
+Example::
+
+    thesdk.CONFIG.get('LSFSUBMISSION')
+    thesdk.CONFIG.get('MAXJOBS', default=4, type=int)
+
+"""
+import os
+import re
+import json
+import hashlib
+import thesdk.bootstrap as bootstrap
+
+# KEY=value, optionally exported
+_entry=re.compile(r'(?:export\s+)?([A-Za-z_][A-Za-z0-9_]*)=(.*)')
+
+def parse(configfile):
+    '''Parses all KEY=value entries of configfile.
+
+    Returns
+    -------
+    dict
+
+    '''
+    entries={}
+    with open(configfile,'r') as fid:
+        for line in fid:
+            match=_entry.match(line)
+            if match:
+                entries[match.group(1)]=match.group(2).replace('"','')
+    return entries
+
+class Config:
+    '''Parsed configuration file.
+
+    Parameters
+    ----------
+    configfile: str
+        Path to the configuration file.
+
+    '''
+    def __init__(self,configfile):
+        self.configfile=configfile
+        self._entries=None
+
+    @property
+    def cachefile(self):
+        '''Path of the disk cache of the parsed entries.
+
+        '''
+        return os.path.join(bootstrap.cachedir(),'config_%s.json'
+                %(hashlib.sha1(self.configfile.encode('utf-8')).hexdigest()[:16]))
+
+    @property
+    def entries(self):
+        '''dict: All KEY=value entries of the configuration file. Parsed
+        on first access, or loaded from the disk cache if the file is unchanged.
+        Empty if the file does not exist.
+
+        '''
+        if self._entries is None:
+            self._entries=self._load()
+        return self._entries
+
+    def _load(self):
+        try:
+            stat=os.stat(self.configfile)
+        except OSError:
+            print("Config file %s not found" %(self.configfile))
+            return {}
+        key=[ stat.st_mtime_ns, stat.st_size ]
+        try:
+            with open(self.cachefile) as fid:
+                cached=json.load(fid)
+            if cached['key'] == key:
+                return cached['entries']
+        except (OSError,ValueError,KeyError):
+            pass
+        entries=parse(self.configfile)
+        try:
+            os.makedirs(bootstrap.cachedir(),exist_ok=True)
+            tmpfile='%s.%d' %(self.cachefile,os.getpid())
+            with open(tmpfile,'w') as fid:
+                json.dump({ 'key' : key, 'entries' : entries },fid)
+            os.replace(tmpfile,self.cachefile)
+        except OSError:
+            pass
+        return entries
+
+    def reload(self):
+        '''Discards the parsed entries. The file is checked again on next access.
+
+        '''
+        self._entries=None
+
+    def get(self,key,default=None,type=str):
+        '''Value of key converted with type.
+
+        Parameters
+        ----------
+        key: str
+            Name of the entry.
+        default: object, None
+            Returned if the key is not defined or the value is empty.
+        type: callable, str
+            Conversion of the value. For bool, values '1', 'true', 'yes'
+            and 'on' are True, case insensitive.
+
+        '''
+        value=self.entries.get(key,'')
+        if value == '':
+            return default
+        if type is bool:
+            return value.strip().lower() in [ '1', 'true', 'yes', 'on' ]
+        return type(value)
+
+    def __contains__(self,key):
+        return key in self.entries
+
+    def __getitem__(self,key):
+        return self.entries[key]
+
+    def keys(self):
+        return self.entries.keys()
@@ -0,0 +1,92 @@
+"""
+=======
+Fsstats
+=======
+
+Counters of the filesystem calls made by thesdk.
+
+The filesystem calls of thesdk and iofile go through the functions of
+this module, which count them by kind. On network filesystems every call
+is a round-trip to the server, so the counts help to locate redundant
+calls.
+
+Example::
+
+    thesdk.fs_report()
+
+"""
+import os
+import glob as _glob
+import builtins
+import threading
+
+# Number of calls by kind
+counts={}
+# Calls are counted also from the thread pools of the iofile bundle
+_lock=threading.Lock()
+
+def _after_fork():
+    global _lock
+    # Lock may be held by a thread that does not exist in the child
+    _lock=threading.Lock()
+
+if hasattr(os,'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
+
+def count(kind):
+    '''Increments the count of calls of kind.
+
+    '''
+    with _lock:
+        counts[kind]=counts.get(kind,0)+1
+
+def reset():
+    '''Resets all counts to zero.
+
+    '''
+    with _lock:
+        counts.clear()
+
+def report():
+    '''Returns the counts as printable text.
+
+    '''
+    with _lock:
+        items=sorted(counts.items())
+    lines=[ 'Filesystem calls:' ]
+    for kind,value in items:
+        lines.append('    %-24s %8d' %(kind,value))
+    lines.append('    %-24s %8d' %('total',sum(value for _,value in items)))
+    return '\n'.join(lines)
+
+def exists(path):
+    count('exists')
+    return os.path.exists(path)
+
+def isfile(path):
+    count('isfile')
+    return os.path.isfile(path)
+
+def isdir(path):
+    count('isdir')
+    return os.path.isdir(path)
+
+def makedirs(path,exist_ok=False):
+    count('makedirs')
+    os.makedirs(path,exist_ok=exist_ok)
+
+def remove(path):
+    count('remove')
+    os.remove(path)
+
+def listdir(path):
+    count('listdir')
+    return os.listdir(path)
+
+def glob(pattern):
+    count('glob')
+    return _glob.glob(pattern)
+
+def open(file,*args,**kwargs):
+    count('open')
+    return builtins.open(file,*args,**kwargs)
@@ -11,6 +11,9 @@ Intention is to keep as much of the file io as general adn common as possible.
 The simulator specific file-io functions should be written in simulator specific file-io
 packages.
 
+Binary format 'bin' is provided as an alternative to the CSF text format
+for simulators and models capable of dumping raw data. See iofile.fileformat.
+
 Initially written for Verilog file-io by Marko Kosunen, marko.kosunen@aalto.fi,
 Yue Dai, 2018
 
@@ -25,9 +28,18 @@ import random
 import string
 from abc import * 
 from thesdk import *
+import thesdk.fsstats as fsstats
+from thesdk.profiler import profiled
+import json
+import struct
 import numpy as np
 import pandas as pd
 
+# Binary IO-file format. See iofile.fileformat
+BINMAGIC=b'THESDKIO'
+BINVERSION=1
+BINALIGN=64
+
 class iofile(IO):
      '''
      Class to provide file IO for external simulators. 
@@ -79,11 +91,17 @@ class iofile(IO):
              self.hasheader=kwargs.get('hasheader',False) # Headers False by default. 
                                                           # Do not generate things just 
                                                           # to remove them in the next step
+             self.fileformat=kwargs.get('fileformat','csf') # Text format by default
 
              if hasattr(self.parent,'preserve_iofiles'):
                  self.preserve=parent.preserve_iofiles
              else:
                  self.preserve=False
+
+             if 'durability' in kwargs:
+                 self.durability=kwargs.get('durability')
+             elif hasattr(self.parent,'iofile_durability'):
+                 self.durability=parent.iofile_durability
          except:
              self.print_log(type='F', msg="IO-file definition failed")
  
@@ -182,7 +200,8 @@ class iofile(IO):
          '''
          if not hasattr(self,'_file'):
              self._file=self.parent.simpath +'/' + self.name \
-                     + '_' + self.rndpart +'.txt'
+                     + '_' + self.rndpart \
+                     + ('.bin' if self.fileformat == 'bin' else '.txt')
          return self._file
      @file.setter
      def file(self,val):
@@ -191,6 +210,126 @@ class iofile(IO):
  
  
  
+     @property
+     def fileformat(self):
+         ''' Format of the IO file: 'csf' (default) | 'bin'
+
+             csf
+                 Tab separated text format. Complex values are
+                 represented as adjacent Real and Imag columns.
+
+             bin
+                 Fixed width little-endian raw data preceded by a header.
+                 Data is read with numpy.memmap, i.e. without parsing
+                 and copying. File layout:
+
+                 * 8 bytes: magic 'THESDKIO'
+                 * uint32: format version (1)
+                 * uint32: length of the JSON description in bytes
+                 * JSON description padded with spaces so that the data
+                   starts at a 64 byte boundary. Keys: 'dtype' (numpy
+                   dtype string, e.g. '<i8', '<c16'), 'shape' ([rows, cols]),
+                   'layout', 'iotype' and 'pairs'.
+                 * Data in C (row-major) order.
+
+                 Layout is 'real' for real valued data, 'complex' for
+                 native complex values and 'pairs' if complex values
+                 are stored as adjacent Real and Imag columns like in
+                 csf. For 'pairs', 'pairs' lists for each column of the
+                 written data whether it was split, so that e.g. the
+                 timestamp of an event file is not merged. 'pairs' layout
+                 requires merging, and is therefore copied when read.
+
+         '''
+         if not hasattr(self,'_fileformat'):
+             self._fileformat='csf'
+         return self._fileformat
+
+     @fileformat.setter
+     def fileformat(self,value):
+         if value not in [ 'csf', 'bin' ]:
+             self.print_log(type='F', msg='File format %s not supported.' %(value))
+         self._fileformat=value
+
+     @property
+     def durability(self):
+         ''' Durability of the written file: 'none' | 'fsync' (default) | 'batch'
+
+             none
+                 File is closed after writing, which flushes the Python
+                 buffers to the operating system. Data is written to disk
+                 whenever the operating system decides to. 'flush' is
+                 accepted as an alias of 'none'.
+
+             fsync
+                 File is flushed and synchronized to disk with os.fsync
+                 on the write handle before it is closed.
+
+             batch
+                 File is closed after writing, and synchronized to disk
+                 together with the other pending files of the iofile_bundle
+                 when parent.sync_iofile_bundle() is called before the
+                 simulator is launched. See sync.
+
+         Default is inherited from the iofile_durability property of the parent.
+
+         '''
+         if not hasattr(self,'_durability'):
+             self._durability='fsync'
+         return self._durability
+
+     @durability.setter
+     def durability(self,value):
+         if value == 'flush':
+             # Closing the file always flushes
+             value='none'
+         if value not in [ 'none', 'fsync', 'batch' ]:
+             self.print_log(type='F', msg='Durability mode %s not supported.' %(value))
+         self._durability=value
+
+     @property
+     def sync_pending(self):
+         ''' True if the file is written with 'batch' durability
+         but not yet synchronized to disk.
+
+         '''
+         if not hasattr(self,'_sync_pending'):
+             self._sync_pending=False
+         return self._sync_pending
+
+     @sync_pending.setter
+     def sync_pending(self,value):
+         self._sync_pending=value
+
+     def _sync(self,fd):
+         '''Flushes cached file system writes of an open file
+         according to durability.
+
+         '''
+         if self.durability=='fsync':
+             fd.flush()
+             os.fsync(fd.fileno())
+         self.sync_pending = self.durability=='batch'
+         if self.sync_pending:
+             self._sync_path=fd.name
+
+     def sync(self):
+         '''Synchronizes a file written with 'batch' durability to disk.
+         Only the data of this file is synchronized.
+
+         '''
+         if not self.sync_pending:
+             return
+         fd=os.open(self._sync_path,os.O_RDONLY)
+         try:
+             if hasattr(os,'fdatasync'):
+                 os.fdatasync(fd)
+             else:
+                 os.fsync(fd)
+         finally:
+             os.close(fd)
+         self.sync_pending=False
+
      # Relocate i.e. change parent. 
      # probably this could be automated
      # by using properties
@@ -204,7 +343,227 @@ class iofile(IO):
          if hasattr(self.parent,'iofile_bundle'):
              self.parent.iofile_bundle.new(name=self.name,val=self)
  
+     def _parse(self,data,iotype):
+         '''Splits the complex columns of data to Real and Imag columns.
+
+         The output matrix is preallocated and filled in a single pass
+         instead of concatenating one column at a time.
+
+         Parameters
+         ----------
+         data: numpy_array
+             Data to be parsed
+         iotype: str
+             IO type of the IO file. In case of 'event', the first column
+             is the timestamp.
+
+         Returns
+         -------
+         (numpy_array, list(str))
+             Parsed data and the corresponding header line.
+
+         '''
+         data=np.asarray(data)
+         if data.ndim==1:
+             data=data.reshape(-1,1)
+         header_line = []
+         iscomplex=[]
+         for i in range(data.shape[1]):
+             iscomplex.append(bool(np.iscomplex(data[0,i]) or np.iscomplexobj(data[0,i]))
+                     if data.shape[0]>0 else np.iscomplexobj(data))
+             if iotype=='event' and i==0:
+                 if iscomplex[0]:
+                     self.print_log(type='F', msg='Timestamp can not be complex.')
+                 header_line.append('Timestamp')
+             elif iscomplex[i]:
+                 header_line.append('%s_%s_Real' %(self.name,i))
+                 header_line.append('%s_%s_Imag' %(self.name,i))
+             else:
+                 header_line.append('%s_%s' %(self.name,i))
+         if not any(iscomplex):
+             return data, header_line
+         parsed=np.empty((data.shape[0],len(header_line)),dtype=np.real(data[:0]).dtype)
+         col=0
+         for i in range(data.shape[1]):
+             if iscomplex[i]:
+                 column=data[:,i]
+                 if column.dtype.hasobject:
+                     # np.real and np.imag do not apply to objects
+                     column=column.astype(complex)
+                 parsed[:,col]=np.real(column)
+                 parsed[:,col+1]=np.imag(column)
+                 col+=2
+             else:
+                 parsed[:,col]=data[:,i]
+                 col+=1
+         return parsed, header_line
+
+     def _check_int(self,parsed):
+         '''Checks that floating point data can be written as integers.
+
+         Raises the same errors as the pandas engine instead of
+         truncating.
+
+         Raises
+         ------
+         ValueError
+             If the data has non-finite or non-integral values.
+
+         '''
+         if parsed.dtype.hasobject:
+             # Numbers of mixed types, e.g. split from complex columns
+             self._check_int(np.array(parsed.tolist()))
+         elif parsed.dtype.kind == 'c':
+             self._check_int(np.real(parsed))
+             self._check_int(np.imag(parsed))
+         elif parsed.dtype.kind == 'f':
+             if not np.isfinite(parsed).all():
+                 raise ValueError('Cannot convert non-finite values (NA or inf) to integer')
+             if not np.array_equal(parsed,np.trunc(parsed)):
+                 raise ValueError('Trying to coerce float values to integers')
+
+     def _write_int(self,fd,parsed,header_line):
+         '''Bulk writer for integer data.
+
+         Formats the rows in chunks with a single string formatting
+         operation per chunk. Output is identical to the tab separated
+         output of pandas.
+
+         '''
+         if self.hasheader:
+             fd.write('\t'.join(header_line)+'\n')
+         if parsed.shape[1]==0:
+             return
+         fmt='\t'.join(['%d']*parsed.shape[1])+'\n'
+         chunk=65536
+         for start in range(0,parsed.shape[0],chunk):
+             block=parsed[start:start+chunk]
+             fd.write((fmt*block.shape[0]) % tuple(block.ravel().tolist()))
+
+     def _write_bin(self,data,datatype,iotype):
+         '''Writes the data in binary format. See fileformat.
+
+         '''
+         data=np.asarray(data)
+         if data.ndim==1:
+             data=data.reshape(-1,1)
+         if np.iscomplexobj(data) and iotype=='sample':
+             layout='complex'
+             pairs=None
+             if datatype in [ 'int', 'sint', 'complex', 'scomplex' ]:
+                 self._check_int(data)
+                 parsed=np.empty(data.shape,dtype='<c16')
+                 parsed.real=np.real(data).astype(np.int64)
+                 parsed.imag=np.imag(data).astype(np.int64)
+             else:
+                 parsed=data
+         else:
+             parsed, header_line = self._parse(data,iotype)
+             layout='pairs' if parsed.shape[1] != data.shape[1] else 'real'
+             if datatype in [ 'int', 'sint', 'complex', 'scomplex' ]:
+                 self._check_int(parsed)
+                 parsed=parsed.astype(np.int64,copy=False)
+             # Columns of data split to Real and Imag pairs
+             pairs=[ name.endswith('_Real') for name in header_line if not name.endswith('_Imag') ]
+         if parsed.dtype.hasobject:
+             # Numbers of mixed types, e.g. split from complex columns
+             parsed=np.array(parsed.tolist())
+         if parsed.dtype.hasobject:
+             self.print_log(type='F', msg='Object data can not be written in binary format.')
+         parsed=np.ascontiguousarray(parsed,dtype=parsed.dtype.newbyteorder('<'))
+         description=json.dumps({
+             'dtype' : parsed.dtype.str,
+             'shape' : list(parsed.shape),
+             'layout' : layout,
+             'iotype' : iotype,
+             'pairs' : pairs if layout=='pairs' else None,
+             }).encode('utf-8')
+         length=len(description)+(-(len(BINMAGIC)+8+len(description)) % BINALIGN)
+         with fsstats.open(self.file,'wb') as fd:
+             fd.write(BINMAGIC+struct.pack('<II',BINVERSION,length))
+             fd.write(description.ljust(length))
+             fd.write(parsed.data)
+             self._sync(fd)
+
+     def _read_bin(self):
+         '''Reads the binary format. See fileformat.
+
+         Returns
+         -------
+         numpy_array
+             numpy.memmap of the data for layouts 'real' and 'complex'.
+             Memory map is copy-on-write, i.e. modifications are not
+             written to file.
+
+         '''
+         values,description=self._open_bin()
+         return self._merge_bin(values,description)
+
+     def _open_bin(self):
+         '''Opens the binary format without merging the columns.
+
+         Returns
+         -------
+         numpy_array, dict
+             numpy.memmap of the values as written to the file, and the
+             description of the file.
+
+         '''
+         with fsstats.open(self.file,'rb') as fd:
+             head=fd.read(len(BINMAGIC)+8)
+             if len(head) < len(BINMAGIC)+8 or head[:len(BINMAGIC)] != BINMAGIC:
+                 self.print_log(type='F', msg='%s is not a binary IO file.' %(self.file))
+             version,length=struct.unpack('<II',head[len(BINMAGIC):])
+             if version > BINVERSION:
+                 self.print_log(type='F', msg='Binary IO file version %d not supported.' %(version))
+             description=json.loads(fd.read(length).decode('utf-8'))
+         shape=tuple(description['shape'])
+         if shape[0]==0:
+             values=np.empty(shape,dtype=description['dtype'])
+         else:
+             values=np.memmap(self.file,dtype=description['dtype'],mode='c',
+                     offset=len(BINMAGIC)+8+length,shape=shape)
+         return values,description
+
+     def _merge_bin(self,values,description):
+         '''Merges the Real and Imag columns of the binary format according to the
+         layout in description. See _open_bin.
+
+         '''
+         if description['layout']=='pairs':
+             if description.get('pairs') is None:
+                 # Files written without the column layout
+                 return self._merge(values,'complex')
+             return self._merge_pairs(values,description['pairs'])
+         return values
+
+     def _merge_pairs(self,values,pairs):
+         '''Merges the Real and Imag columns of the 'pairs' layout of the
+         binary format. Inverse of _parse.
+
+         Parameters
+         ----------
+         values: numpy_array
+             Data as read from the file
+         pairs: list(bool)
+             For each column of the written data, True if it was split
+             to Real and Imag columns.
+
+         '''
+         data=np.empty((values.shape[0],len(pairs)),dtype=np.result_type(values.dtype,np.complex64))
+         col=0
+         for i,pair in enumerate(pairs):
+             if pair:
+                 data[:,i].real=values[:,col]
+                 data[:,i].imag=values[:,col+1]
+                 col+=2
+             else:
+                 data[:,i]=values[:,col]
+                 col+=1
+         return data
+
      # File writing
+     @profiled()
      def write(self,**kwargs):
          '''Method to write the file
 
@@ -220,6 +579,13 @@ class iofile(IO):
                 Datatype of the data.
              iotype: str, self.iotype
                 IO type of the IO file.
+             fileformat: str, self.fileformat
+                'csf' | 'bin'
+             engine: str, 'numpy'
+                'numpy' | 'pandas'. Integer data types are written with a
+                vectorized bulk writer by default. 'pandas' uses
+                pandas.DataFrame.to_csv for all data types. Other
+                data types are always written with pandas.
 
          '''
          self.dir='in'  # Only input files are written
@@ -227,76 +593,87 @@ class iofile(IO):
          data=kwargs.get('data',self.Data)
          datatype=kwargs.get('datatype',self.datatype)
          iotype=kwargs.get('iotype',self.iotype)
-         header_line = []
-         parsed=[]
-         # Default is the data file
-         if iotype=='sample':
-             for i in range(data.shape[1]):
-                 if i==0:
-                    if np.iscomplex(data[0,i]) or np.iscomplexobj(data[0,i]) :
-                        parsed=np.r_['1',np.real(data[:,i]).reshape(-1,1),
-                                np.imag(data[:,i].reshape(-1,1))]
-                        header_line.append('%s_%s_Real' %(self.name,i))
-                        header_line.append('%s_%s_Imag' %(self.name,i))
-                    else:
-                        parsed=np.r_['1',data[:,i].reshape(-1,1)]
-                        header_line.append('%s_%s' %(self.name,i))
-                 else:
-                    if np.iscomplex(data[0,i]) or np.iscomplexobj(data[0,i]) :
-                        parsed=np.r_['1',parsed,np.real(data[:,i]).reshape(-1,1),
-                                np.imag(data[:,i].reshape(-1,1))]
-                        header_line.append('%s_%s_Real' %(self.name,i))
-                        header_line.append('%s_%s_Imag' %(self.name,i))
-                    else:
-                        parsed=np.r_['1',parsed,data[:,i].reshape(-1,1)]
-                        header_line.append('%s_%s' %(self.name,i))
- 
-             # Numbers are printed as intergers
-             # These are verilog related, do not belong here
+         engine=kwargs.get('engine','numpy')
+         fileformat=kwargs.get('fileformat',self.fileformat)
+         if iotype not in [ 'sample', 'event' ]:
+             self.print_log(type='F', msg='IO type %s not supported.' %(iotype))
+         if fileformat=='bin':
+             self._write_bin(data,datatype,iotype)
+         else:
+             self._write_csf(data,datatype,iotype,engine)
+
+     def _write_csf(self,data,datatype,iotype,engine):
+         '''Writes the data in CSF text format
+
+         '''
+         # In event files the first column is the timestamp
+         parsed, header_line = self._parse(data,iotype)
+
+         # Numbers are printed as intergers
+         # These are verilog related, do not belong here
+         if datatype in [ 'int', 'sint', 'complex', 'scomplex' ] and engine=='numpy':
+             self._check_int(parsed)
+             parsed=parsed.astype(np.int64,copy=False)
+             with fsstats.open(self.file,'w') as fd:
+                 self._write_int(fd,parsed,header_line)
+                 self._sync(fd)
+         else:
              if datatype in [ 'int', 'sint', 'complex', 'scomplex' ]:
                  df=pd.DataFrame(parsed,dtype='int')
              else:
                  df=pd.DataFrame(parsed,dtype=datatype)
- 
-             if self.hasheader:
-                 df.to_csv(path_or_buf=self.file,sep="\t",
-                         index=False,header=header_line)
-             else:
-                 df.to_csv(path_or_buf=self.file,sep="\t",
-                         index=False,header=False)
-         # Control file is a different thing
-         elif iotype=='event':
-             for i in range(data.shape[1]):
-                 if i==0:
-                    if np.iscomplex(data[0,i]) or np.iscomplexobj(data[0,i]) :
-                        self.print_log(type='F', msg='Timestamp can not be complex.')
-                    else:
-                        parsed=np.r_['1',data[:,i].reshape(-1,1)]
-                        header_line.append('Timestamp')
+
+             with fsstats.open(self.file,'w') as fd:
+                 if self.hasheader:
+                     df.to_csv(path_or_buf=fd,sep="\t",
+                             index=False,header=header_line)
                  else:
-                    if np.iscomplex(data[0,i]) or np.iscomplexobj(data[0,i]) :
-                        parsed=np.r_['1',parsed,np.real(data[:,i]).reshape(-1,1),
-                                np.imag(data[:,i].reshape(-1,1))]
-                        header_line.append('%s_%s_Real' %(self.name,i))
-                        header_line.append('%s_%s_Imag' %(self.name,i))
-                    else:
-                        parsed=np.r_['1',parsed,data[:,i].reshape(-1,1)]
-                        header_line.append('%s_%s' %(self.name,i))
- 
+                     df.to_csv(path_or_buf=fd,sep="\t",
+                             index=False,header=False)
+                 self._sync(fd)
+         
+     def _merge(self,values,datatype):
+         '''Merges adjacent Real and Imag columns to complex numbers.
+
+         The columns are merged with a single strided view of the
+         real and imaginary columns. Values of other data types are
+         returned as is.
+
+         Parameters
+         ----------
+         values: numpy_array
+             Data as read from the file
+         datatype: str
+             'complex' | 'int' | 'scomplex' | 'sint' | object
+
+         '''
+         if datatype == 'complex' or datatype == 'scomplex':
+             cols=int(values.shape[1]/2)
+             data=np.zeros((values.shape[0],cols),dtype=complex)
+             data.real=values[:,0:2*cols:2].astype('int')
+             data.imag=values[:,1:2*cols:2].astype('int')
+             return data
+         else:
+             return values
+
+     def _read_dtype(self,datatype,**kwargs):
+         '''Resolves the dtype and the number of skipped rows for the parser
+         from the keyword arguments of read.
+
+         '''
+         if kwargs.get('typed',False):
              if datatype in [ 'int', 'sint', 'complex', 'scomplex' ]:
-                 df=pd.DataFrame(parsed,dtype='int')
+                 dtype=kwargs.get('dtype','int64')
              else:
-                 df=pd.DataFrame(parsed,dtype=datatype)
+                 dtype=kwargs.get('dtype',None)
+             skiprows=1 if self.hasheader else None
+         else:
+             dtype=kwargs.get('dtype',object)
+             skiprows=None
+         return dtype, skiprows
 
-             if self.hasheader:
-                 df.to_csv(path_or_buf=self.file,sep="\t",index=False,header=header_line)
-             else:
-                 df.to_csv(path_or_buf=self.file,sep="\t",index=False,header=False)
-         # Flush cached file system writes
-         with open(self.file) as fd:
-             os.fsync(fd)
-         
      # Reading
+     @profiled()
      def read(self,**kwargs):
          ''' Method to read the file
 
@@ -310,35 +687,83 @@ class iofile(IO):
                 The datatype of the actual file. Default is object, 
                 i.e data is first read to internal variable as string. 
                 This is a help parameter to give more control over reading.
+            typed: bool, False
+                If True, the file is parsed directly to a numeric buffer.
+                The default dtype is then 'int64' for datatypes 'int', 'sint',
+                'complex' and 'scomplex', and inferred by the parser for others.
+                Header line is skipped if hasheader is True.
+
+         Files in 'bin' fileformat are memory mapped, parameters
+         dtype and typed have no effect.
 
          '''
-         fid=open(self.file,'r')
          self.datatype=kwargs.get('datatype',self.datatype)
-         dtype=kwargs.get('dtype',object)
+         if self.fileformat=='bin':
+             self.Data=self._read_bin()
+             return
+         fid=fsstats.open(self.file,'r')
+         dtype,skiprows=self._read_dtype(self.datatype,**kwargs)
          try:
-            readd = pd.read_csv(fid,dtype=dtype,sep='\t',header=None)
+            readd = pd.read_csv(fid,dtype=dtype,sep='\t',header=None,skiprows=skiprows)
             #read method for complex signal matrix
             if self.datatype == 'complex' or self.datatype == 'scomplex':
                 self.print_log(type="I", msg="Reading complex")
-                rows=int(readd.values.shape[0])
-                cols=int(readd.values.shape[1]/2)
-                for i in range(cols):
-                    if i==0:
-                        self.Data=np.zeros((rows, cols),dtype=complex)
-                        self.Data[:,i]=readd.values[:,2*i].astype('int')\
-                                +1j*readd.values[:,2*i+1].astype('int')
-                    else:
-                        self.Data[:,i]=readd.values[:,2*i].astype('int')\
-                                +1j*readd.values[:,2*i+1].astype('int')
-    
-            else:
-                self.Data=readd.values
+            self.Data=self._merge(readd.values,self.datatype)
          except pd.errors.EmptyDataError:
             # File was empty
             self.print_log(type="W", msg="IOFile was empty! %s" %(self.file))
             self.Data = None
          fid.close()
  
+     def iter_chunks(self,rows=100000,**kwargs):
+         '''Iterate over the file in blocks of rows.
+
+         Enables processing of files that do not fit in memory.
+         The Data attribute is not modified.
+
+         Example::
+
+             for block in self.iofile_bundle.Members['Z'].iter_chunks(rows=10000,typed=True):
+                 power+=np.sum(np.abs(block)**2)
+
+         Parameters
+         ----------
+         rows: int, 100000
+             Number of rows per block. The last block may be shorter.
+
+         **kwargs:
+            datatype: str, self.datatype
+                Controls if the data is read in as complex or real
+            dtype: str, 'object'
+                The datatype of the actual file. See read.
+            typed: bool, False
+                Parse the file directly to numeric buffers. See read.
+
+         Blocks of binary files are slices of the memory map. Blocks of
+         the 'pairs' layout are merged to complex one block at a time.
+
+         Yields
+         ------
+         numpy_array
+             Block of Data, with the same datatype handling as in read.
+
+         '''
+         if self.fileformat=='bin':
+             values,description=self._open_bin()
+             for start in range(0,values.shape[0],rows):
+                 yield self._merge_bin(values[start:start+rows],description)
+             return
+         datatype=kwargs.get('datatype',self.datatype)
+         dtype,skiprows=self._read_dtype(datatype,**kwargs)
+         try:
+             with pd.read_csv(self.file,dtype=dtype,sep='\t',header=None,
+                     skiprows=skiprows,chunksize=rows) as reader:
+                 for chunk in reader:
+                     yield self._merge(chunk.values,datatype)
+         except pd.errors.EmptyDataError:
+             # File was empty
+             self.print_log(type="W", msg="IOFile was empty! %s" %(self.file))
+
      # Remove the file when no longer needed
      def remove(self):
          '''Remove the file
@@ -349,7 +774,7 @@ class iofile(IO):
              self.print_log(type="I", msg="Preserving file %s" %(self.file))
          else:
              try:
-                 os.remove(self.file)
+                 fsstats.remove(self.file)
              except:
                  pass
  
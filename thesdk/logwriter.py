@@ -0,0 +1,173 @@
+"""
+=========
+Logwriter
+=========
+
+Backends for writing the log lines of thesdk.print_log to the logfile.
+
+'direct' opens, appends and closes the logfile for every line.
+'buffered' keeps the logfile open, buffers the lines and flushes
+them periodically. 'thread' passes the lines to a background writer thread
+through a queue.
+
+Buffered lines are flushed at exit, before forking and at the exit of
+multiprocessing child processes. Only complete lines are flushed, each
+flush with a single os.write on an O_APPEND descriptor, so lines of
+processes sharing the logfile, e.g. forked workers, are not split.
+
+"""
+import os
+import time
+import queue
+import atexit
+import threading
+import multiprocessing.util
+
+class LogWriter:
+    '''Writer of log lines.
+
+    Parameters
+    ----------
+    backend: str, 'direct'
+        'direct' | 'buffered' | 'thread'
+    flush_interval: float, 1.0
+        Maximum time in seconds the lines are kept in buffers
+        before they are written to the file.
+
+    '''
+    # Buffered size in bytes at which the lines are flushed
+    BUFFERSIZE=65536
+
+    def __init__(self,backend='direct',flush_interval=1.0):
+        self._lock=threading.RLock()
+        self._fd=None
+        self._path=None
+        self._buffer=[]
+        self._size=0
+        self._lastflush=time.monotonic()
+        self._queue=None
+        self._thread=None
+        self.configure(backend=backend,flush_interval=flush_interval)
+        atexit.register(self.close)
+        if hasattr(os,'register_at_fork'):
+            os.register_at_fork(before=self.flush,
+                    after_in_child=self._after_fork)
+        # Child processes of multiprocessing do not run atexit handlers
+        multiprocessing.util.register_after_fork(self,LogWriter._finalize_child)
+
+    def configure(self,backend='direct',flush_interval=1.0):
+        '''Change the backend. Pending lines are written first.
+
+        '''
+        if backend not in [ 'direct', 'buffered', 'thread' ]:
+            raise ValueError("Log backend %s not supported." %(backend))
+        self.close()
+        self.backend=backend
+        self.flush_interval=flush_interval
+
+    def write(self,path,line):
+        '''Append line to file at path.
+
+        '''
+        if self.backend=='direct':
+            fid=open(path,'a')
+            fid.write(line)
+            fid.close()
+        elif self.backend=='buffered':
+            with self._lock:
+                self._write(path,line)
+                if time.monotonic()-self._lastflush > self.flush_interval:
+                    self._flush()
+        else:
+            if self._thread is None or not self._thread.is_alive():
+                self._start()
+            self._queue.put((path,line))
+
+    def flush(self):
+        '''Write all pending lines to the file.
+
+        '''
+        if self._thread is not None and self._thread.is_alive():
+            done=threading.Event()
+            self._queue.put(done)
+            done.wait()
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        '''Flush and close the file handle. Writer thread is stopped.
+
+        '''
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._thread=None
+        with self._lock:
+            self._flush(complete=False)
+            if self._fd is not None:
+                os.close(self._fd)
+            self._fd=None
+            self._path=None
+            self._buffer=[]
+            self._size=0
+
+    def _write(self,path,line):
+        if path != self._path:
+            self._flush()
+            if self._fd is not None:
+                os.close(self._fd)
+            self._fd=os.open(path,os.O_WRONLY|os.O_APPEND|os.O_CREAT,0o666)
+            self._path=path
+        self._buffer.append(line)
+        self._size+=len(line)
+        if self._size >= self.BUFFERSIZE:
+            self._flush()
+
+    def _flush(self,complete=True):
+        if self._fd is not None and self._buffer:
+            text=''.join(self._buffer)
+            # Incomplete last line is kept until it is complete
+            end=text.rfind('\n')+1 if complete else len(text)
+            data=text[:end].encode('utf-8')
+            self._buffer=[ text[end:] ] if end < len(text) else []
+            self._size=len(text)-end
+            while data:
+                written=os.write(self._fd,data)
+                data=data[written:]
+        self._lastflush=time.monotonic()
+
+    def _start(self):
+        self._queue=queue.SimpleQueue()
+        self._thread=threading.Thread(target=self._run,name='thesdk-logwriter',daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                item=self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                with self._lock:
+                    self._flush()
+                continue
+            if item is None:
+                return
+            with self._lock:
+                if isinstance(item,threading.Event):
+                    self._flush()
+                    item.set()
+                else:
+                    self._write(*item)
+                    if time.monotonic()-self._lastflush > self.flush_interval:
+                        self._flush()
+
+    def _after_fork(self):
+        # Buffers were flushed before fork. Threads do not survive the fork,
+        # writer thread is restarted on next write.
+        self._lock=threading.RLock()
+        self._thread=None
+        # Incomplete line of the parent is written by the parent
+        self._buffer=[]
+        self._size=0
+
+    def _finalize_child(self):
+        multiprocessing.util.Finalize(self,self.close,exitpriority=10)
@@ -0,0 +1,1163 @@
+"""
+========
+Parallel
+========
+
+Helpers for thesdk.run_parallel.
+
+Local runs are supervised by the parent process. Each worker process is
+connected to the parent with a pipe, through which it receives the
+indexes of the DUTs to run and sends messages of form (kind, index,
+value), where kind is
+
+    'start'
+        DUT index started in worker process with pid value.
+    'done'
+        DUT index finished, value is the returned dictionary.
+
+In 'pool' mode a fixed set of worker processes is started, and each
+worker runs the DUTs one after another, so the process start-up is paid
+only once per worker. In 'batch' mode every DUT runs in a new worker.
+Workers exceeding the timeout are killed, and workers exiting without
+sending the result are detected through their exit code. Timed out and
+crashed DUTs are retried in new workers up to the given number of
+retries. The outcome of every DUT is recorded in a JobReport. With
+max_jobs='auto', the number of concurrent jobs follows the available
+CPUs and memory, see Scheduler.
+
+With the 'shm' transport, large NumPy arrays of the returned dictionary
+are not pickled through the queue. They are written to files in shared
+memory (/dev/shm if available) by the worker, and only SharedArray
+descriptors are sent. The parent maps the files copy-on-write, so the
+arrays are received without copying. The files of a run share a prefix,
+and the files not received, e.g. from killed workers, are removed when
+the run ends or is interrupted.
+
+The instances are run by an Executor:
+
+    LocalExecutor
+        Local processes in 'batch' or 'pool' mode.
+    BatchExecutor
+        Batch jobs submitted with a command template, e.g. LSFSUBMISSION.
+        The instance is pickled to a job file in a shared directory, and
+        the job runs `python -m thesdk.worker <jobfile>`, which writes
+        the returned dictionary to a result file.
+    SocketExecutor
+        Socket workers started with `python -m thesdk.worker --serve
+        host:port`. The instances are sent to the workers and the returned
+        dictionaries received over authenticated connections of
+        multiprocessing.connection. The authentication key is given in the
+        environment variable THESDK_AUTHKEY of both ends.
+
+Executors other than LocalExecutor unpickle the instances in another
+interpreter, so their classes must be importable there, i.e. defined in
+modules, not in the main script.
+
+"""
+import os
+import sys
+import copy
+import json
+import time
+import queue
+import shlex
+import pickle
+import abc
+import argparse
+import glob
+import tempfile
+import threading
+import itertools
+import traceback
+import subprocess
+import multiprocessing
+import multiprocessing.connection
+import numpy as np
+
+import thesdk.runid as runid
+
+# Directory of shared memory files. tmpfs backed if available.
+SHMDIR='/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+_shmcount=itertools.count()
+
+class SharedArray:
+    '''Descriptor of an array stored in a shared memory file.
+
+    The file name starts with prefix, the prefix of the parallel run, so
+    that files left over by the run can be removed with remove_shared.
+
+    '''
+    def __init__(self,array,prefix=None):
+        if prefix is None:
+            prefix=os.path.join(SHMDIR,'thesdk')
+        self.path='%s_%d_%d.npy' %(prefix,os.getpid(),next(_shmcount))
+        np.save(self.path,array,allow_pickle=False)
+        self.nbytes=array.nbytes
+
+    def load(self):
+        '''Maps the array copy-on-write and removes the file. The mapping
+        remains valid after the file is removed.
+
+        '''
+        array=np.load(self.path,mmap_mode='c')
+        os.remove(self.path)
+        return array
+
+    def discard(self):
+        '''Removes the file without loading it.
+
+        '''
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+def shared_prefix():
+    '''New unique prefix of the shared memory files of a parallel run.
+
+    '''
+    return os.path.join(SHMDIR,'thesdk_%s' %(runid.tag()))
+
+def remove_shared(prefix):
+    '''Removes the shared memory files left over by a parallel run, e.g.
+    of results not received from killed workers or of dropped messages.
+
+    Returns
+    -------
+    int
+        Number of removed files.
+
+    '''
+    count=0
+    for path in glob.glob(glob.escape(prefix)+'_*.npy'):
+        try:
+            os.remove(path)
+            count+=1
+        except OSError:
+            pass
+    return count
+
+def _is_shared(array,threshold):
+    return isinstance(array,np.ndarray) and not array.dtype.hasobject \
+            and array.nbytes >= threshold
+
+def encode(ret_dict,threshold,prefix=None):
+    '''Replaces the arrays of at least threshold bytes in ret_dict, also
+    the Data of IOs, with SharedArray descriptors. The files are named
+    with prefix, see SharedArray.
+
+    '''
+    encoded={}
+    for key,value in ret_dict.items():
+        if _is_shared(value,threshold):
+            value=SharedArray(value,prefix)
+        elif _is_shared(getattr(value,'_Data',None),threshold):
+            value=copy.copy(value)
+            value._Data=SharedArray(value._Data,prefix)
+        encoded[key]=value
+    return encoded
+
+def decode(ret_dict):
+    '''Replaces the SharedArray descriptors in ret_dict with the mapped
+    arrays. Inverse of encode.
+
+    '''
+    if not ret_dict:
+        return ret_dict
+    for key,value in ret_dict.items():
+        if isinstance(value,SharedArray):
+            ret_dict[key]=value.load()
+        elif isinstance(getattr(value,'_Data',None),SharedArray):
+            value._Data=value._Data.load()
+    return ret_dict
+
+def discard(ret_dict):
+    '''Removes the shared memory files of an encoded ret_dict that is
+    not decoded.
+
+    '''
+    for value in (ret_dict or {}).values():
+        if isinstance(value,SharedArray):
+            value.discard()
+        elif isinstance(getattr(value,'_Data',None),SharedArray):
+            value._Data.discard()
+
+class ResultQueue:
+    '''Queue given as the `queue` property of a DUT in a local parallel run.
+
+    Sends the returned dictionary, tagged with the index of the DUT,
+    to the parent through the pipe conn. If threshold is given, the
+    dictionary is encoded for the 'shm' transport, with the shared
+    memory files named with prefix.
+
+    '''
+    def __init__(self,conn,index,threshold=None,prefix=None):
+        self.conn=conn
+        self.index=index
+        self.threshold=threshold
+        self.prefix=prefix
+        self.done=False
+
+    def put(self,ret_dict):
+        if self.threshold is not None:
+            ret_dict=encode(ret_dict,self.threshold,self.prefix)
+        self.conn.send(('done',self.index,ret_dict))
+        self.done=True
+
+def run_dut(dut,method,queue):
+    '''Runs 'method' of dut in the current process.
+
+    Fatal errors and exceptions of the DUT do not terminate the worker.
+    If the DUT did not return results, an empty dictionary is returned
+    to mark the run as failed.
+
+    '''
+    dut.par=True
+    dut.queue=queue
+    try:
+        getattr(dut,method)()
+    except SystemExit:
+        # Fatal error in print_log
+        pass
+    except Exception:
+        traceback.print_exc()
+    if not queue.done:
+        queue.put({})
+
+def pool_worker(duts,method,conn,threshold=None,prefix=None):
+    '''Target of the worker processes of local parallel runs.
+
+    Runs DUTs with the indexes received from conn until None is received.
+
+    '''
+    while True:
+        try:
+            index=conn.recv()
+        except EOFError:
+            # Parent exited
+            break
+        if index is None:
+            break
+        conn.send(('start',index,os.getpid()))
+        run_dut(duts[index],method,ResultQueue(conn,index,threshold,prefix))
+
+class JobReport:
+    '''Outcome of the parallel run of one DUT.
+
+    Attributes
+    ----------
+    index: int
+        Index of the DUT.
+    name: str
+        Runname of the DUT.
+    status: str
+        'pending' | 'done' | 'failed' | 'timeout' | 'crashed'.
+        'failed' if the DUT returned an empty dictionary, e.g. after
+        a fatal error. 'crashed' if the worker exited without result.
+    attempts: int
+        Number of times the DUT was started.
+    duration: float
+        Run time of the last attempt in seconds.
+    exitcode: int
+        Exit code of a crashed worker, None otherwise.
+    start: float
+        Start time of the last attempt, seconds since the epoch.
+    end: float
+        End time, seconds since the epoch.
+    pid: int
+        Process id of the worker of the last attempt.
+    nbytes: int
+        Size of the received result in bytes, including the arrays
+        passed through shared memory.
+
+    '''
+    def __init__(self,index,name):
+        self.index=index
+        self.name=name
+        self.status='pending'
+        self.attempts=0
+        self.duration=None
+        self.exitcode=None
+        self.start=None
+        self.end=None
+        self.pid=None
+        self.nbytes=0
+
+    def as_dict(self):
+        return dict(self.__dict__)
+
+    def __repr__(self):
+        return 'JobReport(%d, %s, %s, attempts=%d)' %(self.index,self.name,self.status,self.attempts)
+
+def shared_nbytes(ret_dict):
+    '''Size of the arrays of an encoded ret_dict passed through shared memory.
+
+    '''
+    nbytes=0
+    for value in (ret_dict or {}).values():
+        if isinstance(value,SharedArray):
+            nbytes+=value.nbytes
+        elif isinstance(getattr(value,'_Data',None),SharedArray):
+            nbytes+=value._Data.nbytes
+    return nbytes
+
+class Telemetry:
+    '''Progress metrics of a local parallel run.
+
+    The status is written as JSON to status_file and passed to callback
+    at most every interval seconds while the run progresses, and once at
+    the end. The status is a dictionary with keys
+
+        'time'
+            Time of the status, seconds since the epoch.
+        'elapsed'
+            Seconds since the start of the run.
+        'total', 'pending', 'running', 'finished'
+            Number of jobs.
+        'status'
+            Number of finished jobs by status.
+        'throughput'
+            Finished jobs per second.
+        'eta'
+            Estimated seconds to completion, None before the first job
+            has finished.
+        'slots'
+            Number of concurrent jobs, i.e. max_jobs.
+        'idle_time'
+            Slot-seconds without a running job. A growing idle time
+            towards the end of the run indicates stragglers.
+        'utilization'
+            Fraction of the slot time with a running job, 0.0 without slots.
+        'bytes_received'
+            Total size of the received results.
+        'jobs'
+            JobReport.as_dict of every job, with start and end times.
+
+    Parameters
+    ----------
+    reports: list(JobReport)
+        Reports of the jobs, updated by the caller.
+    slots: int
+        Number of concurrent jobs.
+    status_file: str, None
+    callback: callable, None
+        Called with the status dictionary.
+    interval: float, 5.0
+        Minimum interval of the updates in seconds.
+
+    '''
+    def __init__(self,reports,slots,status_file=None,callback=None,interval=5.0):
+        self.reports=reports
+        self.slots=slots
+        self.status_file=status_file
+        self.callback=callback
+        self.interval=interval
+        self.started=time.monotonic()
+        self.start_time=time.time()
+        self.idle_time=0.0
+        self.bytes_received=0
+        self._running=0
+        self._tick=self.started
+        self._update=None
+
+    @property
+    def enabled(self):
+        return self.status_file is not None or self.callback is not None
+
+    def tick(self,running):
+        '''Accounts the idle slots since the previous tick, and sets
+        the number of running jobs.
+
+        '''
+        now=time.monotonic()
+        self.idle_time+=max(0,self.slots-self._running)*(now-self._tick)
+        self._running=running
+        self._tick=now
+
+    def received(self,nbytes):
+        self.bytes_received+=nbytes
+
+    def status(self):
+        '''The status dictionary, see Telemetry.
+
+        '''
+        self.tick(self._running)
+        elapsed=time.monotonic()-self.started
+        counts={}
+        for report in self.reports:
+            counts[report.status]=counts.get(report.status,0)+1
+        finished=len(self.reports)-counts.get('pending',0)
+        throughput=finished/elapsed if elapsed > 0 else 0.0
+        return {
+                'time' : time.time(),
+                'start' : self.start_time,
+                'elapsed' : elapsed,
+                'total' : len(self.reports),
+                'pending' : counts.get('pending',0)-self._running,
+                'running' : self._running,
+                'finished' : finished,
+                'status' : counts,
+                'throughput' : throughput,
+                'eta' : (len(self.reports)-finished)/throughput if throughput > 0 else None,
+                'slots' : self.slots,
+                'idle_time' : self.idle_time,
+                'utilization' : 1.0-self.idle_time/(self.slots*elapsed) if elapsed > 0 and self.slots > 0 else 0.0,
+                'bytes_received' : self.bytes_received,
+                'jobs' : [ report.as_dict() for report in self.reports ],
+                }
+
+    def update(self,force=False):
+        '''Publishes the status if interval has passed since the previous
+        update, or if force.
+
+        '''
+        if not self.enabled:
+            return
+        now=time.monotonic()
+        if not force and self._update is not None and now-self._update < self.interval:
+            return
+        self._update=now
+        status=self.status()
+        if self.status_file is not None:
+            tmpfile='%s.%d' %(self.status_file,os.getpid())
+            with open(tmpfile,'w') as fid:
+                json.dump(status,fid,indent=1)
+            os.replace(tmpfile,self.status_file)
+        if self.callback is not None:
+            self.callback(status)
+
+def cpu_count():
+    '''Number of CPUs available to this process.
+
+    '''
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def meminfo():
+    '''MemTotal and MemAvailable of /proc/meminfo in bytes, None if not available.
+
+    '''
+    try:
+        info={}
+        with open('/proc/meminfo') as fid:
+            for line in fid:
+                key,value=line.split(':',1)
+                info[key]=int(value.split()[0])*1024
+        return info['MemTotal'],info['MemAvailable']
+    except (OSError,KeyError,ValueError):
+        return None
+
+def private_memory(pid):
+    '''Private resident memory of process pid in bytes, i.e. the memory
+    freed when the process exits. Pages shared copy-on-write with the
+    parent are not counted. 0 if not available.
+
+    '''
+    try:
+        nbytes=0
+        with open('/proc/%d/smaps_rollup' %(pid)) as fid:
+            for line in fid:
+                if line.startswith('Private_'):
+                    nbytes+=int(line.split()[1])*1024
+        return nbytes
+    except (OSError,ValueError):
+        return 0
+
+def cpu_times():
+    '''Busy and total CPU time of the host in clock ticks, summed over
+    the CPUs, from /proc/stat. Idle and iowait time is not busy.
+
+    '''
+    with open('/proc/stat') as fid:
+        values=[ int(value) for value in fid.readline().split()[1:9] ]
+    total=sum(values)
+    return total-values[3]-values[4],total
+
+def process_cpu(pid):
+    '''CPU time of process pid and its descendants in clock ticks,
+    including the time of the reaped children. None if the process
+    has exited.
+
+    '''
+    try:
+        with open('/proc/%d/stat' %(pid)) as fid:
+            # Fields after the command name, utime is the 14th field
+            fields=fid.read().rsplit(')',1)[1].split()
+        ticks=sum(int(value) for value in fields[11:15])
+        children=[]
+        for task in os.listdir('/proc/%d/task' %(pid)):
+            with open('/proc/%d/task/%s/children' %(pid,task)) as fid:
+                children.extend(int(child) for child in fid.read().split())
+    except (OSError,ValueError,IndexError):
+        return None
+    for child in children:
+        ticks+=process_cpu(child) or 0
+    return ticks
+
+class Scheduler:
+    '''Adaptive limit of the concurrent jobs of a local parallel run,
+    max_jobs='auto' of run_parallel.
+
+    The limit is evaluated before dispatching jobs, and is the smallest of
+
+        max_jobs
+            Default: number of available CPUs.
+        CPUs not loaded by other processes
+            Available CPUs less the CPUs used by other processes than
+            the running jobs and their subprocesses. The usage is
+            measured from /proc/stat and /proc/<pid>/stat over the last
+            interval, so a finished job frees its CPU immediately.
+        Jobs fitting in the available memory
+            MemAvailable of /proc/meminfo less mem_reserve of MemTotal,
+            less the memory the running jobs are still expected to
+            allocate, divided by the memory estimate of a job.
+
+    The memory estimate of a job is the largest of mem_per_job and the
+    private memory of the job processes that have finished or run for
+    settle seconds. Until then, and without mem_per_job, at most one job
+    is started per interval. When the available memory runs low, no new jobs are
+    started until running jobs finish. At least one job is always
+    allowed, so that the run progresses.
+
+    Memory of subprocesses started by the DUTs, e.g. external simulators,
+    is not observed per job, only through MemAvailable. For such DUTs,
+    give mem_per_job.
+
+    Parameters
+    ----------
+    max_jobs: int, None
+        Upper limit of concurrent jobs. Number of available CPUs if None.
+    mem_per_job: int, None
+        Estimated memory of a job in bytes.
+    mem_reserve: float, 0.1
+        Fraction of the total memory kept free.
+    interval: float, 1.0
+        Interval in seconds of the memory observations.
+    settle: float, 10.0
+        Run time in seconds after which the memory of a running job is
+        used in the estimate. Jobs that have just started have not yet
+        allocated their memory.
+
+    '''
+    def __init__(self,max_jobs=None,mem_per_job=None,mem_reserve=0.1,interval=1.0,settle=10.0):
+        self.max_jobs=max_jobs if max_jobs is not None else cpu_count()
+        self.mem_per_job=mem_per_job
+        self.mem_reserve=mem_reserve
+        self.interval=interval
+        self.settle=settle
+        # Largest private memory of the finished and settled jobs
+        self.peak=0
+        # Start time and largest private memory of the running jobs by pid
+        self._jobs={}
+        # Resource limiting the jobs, 'max_jobs' | 'cpu' | 'memory'
+        self.reason='max_jobs'
+        # CPUs used by other processes
+        self.external=0.0
+        self._ramp=None
+        self._cpu=None
+        self._ticks={}
+
+    @property
+    def estimate(self):
+        '''Memory estimate of a job in bytes, None if not known.
+
+        '''
+        return max(self.mem_per_job or 0,self.peak) or None
+
+    def limit(self,pids):
+        '''Number of jobs allowed to run, given the pids of the processes
+        running a job.
+
+        '''
+        running=len(pids)
+        usage=[ private_memory(pid) for pid in pids ]
+        self._observe(pids,usage)
+        limits={ 'max_jobs' : self.max_jobs }
+        try:
+            self._measure_cpu(pids)
+            limits['cpu']=cpu_count()-int(round(self.external))
+        except (OSError,ValueError):
+            pass
+        info=meminfo()
+        if info is not None:
+            total,available=info
+            free=available-self.mem_reserve*total
+            estimate=self.estimate
+            if estimate is not None:
+                # Memory the running jobs are still expected to allocate
+                free-=sum(max(0,estimate-used) for used in usage)
+                limits['memory']=running+max(0,int(free//estimate))
+            else:
+                now=time.monotonic()
+                if free > 0 and (self._ramp is None or now-self._ramp >= self.interval):
+                    self._ramp=now
+                    limits['memory']=running+1
+                else:
+                    limits['memory']=running
+        self.reason=min(limits,key=limits.get)
+        return max(1,limits[self.reason])
+
+    def _observe(self,pids,usage):
+        '''Updates the memory of the running jobs, and peak from the jobs
+        that have finished, i.e. are no longer in pids, or have run for
+        settle seconds.
+
+        '''
+        now=time.monotonic()
+        for pid,used in zip(pids,usage):
+            job=self._jobs.setdefault(pid,[ now, 0 ])
+            job[1]=max(job[1],used)
+        for pid,(started,used) in list(self._jobs.items()):
+            if pid not in pids:
+                self.peak=max(self.peak,used)
+                del self._jobs[pid]
+            elif now-started >= self.settle:
+                self.peak=max(self.peak,used)
+
+    def _measure_cpu(self,pids):
+        '''Updates external from the CPU time used since the previous
+        measurement, at most once per interval.
+
+        '''
+        busy,total=cpu_times()
+        if self._cpu is not None:
+            previous_busy,previous_total,previous=self._cpu
+            # Wall time in ticks per CPU
+            elapsed=(total-previous_total)/(os.cpu_count() or 1)
+            if elapsed < self.interval*os.sysconf('SC_CLK_TCK'):
+                return
+        jobs={ pid : process_cpu(pid) for pid in pids }
+        jobs={ pid : ticks for pid,ticks in jobs.items() if ticks is not None }
+        if self._cpu is not None:
+            # Jobs started within the interval are counted from their start.
+            # The time of jobs finished within the interval is not known,
+            # they are counted as using a CPU for the whole interval.
+            used=sum(ticks-self._ticks.get(pid,0) for pid,ticks in jobs.items()) \
+                    +elapsed*len(set(previous)-set(jobs))
+            self.external=max(0.0,(busy-previous_busy-used)/elapsed)
+        self._cpu=(busy,total,jobs)
+        # Latest time of every job process, also of idle pool workers
+        self._ticks.update(jobs)
+
+class Worker:
+    '''Worker process of a local parallel run, as seen from the parent.
+
+    '''
+    def __init__(self,duts,method,threshold=None,prefix=None):
+        self.conn,child=multiprocessing.Pipe()
+        self.proc=multiprocessing.Process(target=pool_worker,
+                args=(duts,method,child,threshold,prefix))
+        self.proc.start()
+        child.close()
+        self.job=None
+        self.started=None
+        self.stopped=False
+
+    def dispatch(self,index):
+        self.job=index
+        self.started=time.monotonic()
+        self.conn.send(index)
+
+    def stop(self):
+        '''Asks the worker to exit after its current job.
+
+        '''
+        self.stopped=True
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+
+    def kill(self):
+        self.proc.kill()
+        self.proc.join()
+        self.conn.close()
+
+class FileQueue:
+    '''Queue of a batch job. Writes the returned dictionary to a file.
+
+    '''
+    def __init__(self,path):
+        self.path=path
+        self.done=False
+
+    def put(self,ret_dict):
+        tmpfile='%s.%d' %(self.path,os.getpid())
+        with open(tmpfile,'wb') as fid:
+            pickle.dump(ret_dict,fid)
+        os.replace(tmpfile,self.path)
+        self.done=True
+
+class ConnectionQueue:
+    '''Queue of a socket worker. Sends the returned dictionary to the
+    coordinator.
+
+    '''
+    def __init__(self,conn):
+        self.conn=conn
+        self.done=False
+
+    def put(self,ret_dict):
+        self.conn.send(ret_dict)
+        self.done=True
+
+def _authkey(authkey=None):
+    if authkey is None:
+        authkey=os.environ.get('THESDK_AUTHKEY')
+    if not authkey:
+        raise ValueError('Authentication key not given, set THESDK_AUTHKEY')
+    return authkey.encode('utf-8') if isinstance(authkey,str) else authkey
+
+def _address(address):
+    host,port=address.rsplit(':',1)
+    return (host,int(port))
+
+class Executor(metaclass=abc.ABCMeta):
+    '''Interface of the executors of thesdk.run_parallel.
+
+    '''
+    @abc.abstractmethod
+    def run(self,entity,duts,method,max_jobs):
+        '''Runs method of duts, at most max_jobs at a time. The returned
+        dictionaries are saved with entity._save_parallel_result.
+
+        Returns
+        -------
+        list(JobReport)
+
+        '''
+        pass
+
+class LocalExecutor(Executor):
+    '''Local worker processes supervised by the parent, see the mode,
+    transport, timeout, retries, progress reporting and adaptive max_jobs
+    of run_parallel.
+
+    In 'pool' mode, max_jobs workers run the duts one after another, and
+    a new dut is dispatched as soon as a worker becomes free. In 'batch'
+    mode, every dut runs in a new worker, in batches of max_jobs. With a
+    scheduler, the number of concurrent jobs is limited by scheduler.limit
+    instead, and in 'batch' mode a new worker is started whenever the
+    limit allows.
+
+    Parameters
+    ----------
+    mode: str, 'batch'
+        'batch' | 'pool'.
+    threshold: int, None
+        Minimum size in bytes of arrays passed through shared memory.
+        No shared memory if None.
+    timeout: float, None
+    retries: int, 0
+    status_file: str, None
+    callback: callable, None
+    status_interval: float, 5.0
+        Progress reporting, see Telemetry.
+    scheduler: Scheduler, None
+
+    '''
+    def __init__(self,mode='batch',threshold=None,timeout=None,retries=0,
+            status_file=None,callback=None,status_interval=5.0,scheduler=None):
+        self.mode=mode
+        self.threshold=threshold
+        self.timeout=timeout
+        self.retries=retries
+        self.status_file=status_file
+        self.callback=callback
+        self.status_interval=status_interval
+        self.scheduler=scheduler
+
+    @property
+    def reuse(self):
+        return self.mode == 'pool'
+
+    def run(self,entity,duts,method,max_jobs):
+        reports=[ JobReport(i,duts[i].runname) for i in range(len(duts)) ]
+        for dut in duts:
+            dut.par = True
+        pending=list(range(len(duts)))
+        workers={}
+        finished=0
+        telemetry=Telemetry(reports,min(max_jobs,len(duts)),
+                self.status_file,self.callback,self.status_interval)
+        # Shared memory files of this run
+        prefix=shared_prefix()
+
+        def start(worker):
+            i=pending.pop(0)
+            reports[i].attempts+=1
+            worker.dispatch(i)
+
+        def finish(i,status,ret_dict,duration,exitcode=None):
+            report=reports[i]
+            report.duration=duration
+            report.exitcode=exitcode
+            report.end=time.time()
+            if status in [ 'timeout', 'crashed' ] and report.attempts <= self.retries:
+                entity.print_log(type='W', msg='Parallel run %d/%d %s, retrying (%d/%d).'
+                        % (i+1,len(duts),'timed out' if status == 'timeout' else 'crashed',
+                            report.attempts,self.retries))
+                pending.insert(0,i)
+                return 0
+            report.status=status
+            entity._save_parallel_result(duts,i,ret_dict)
+            return 1
+
+        reason=None
+        try:
+            while finished < len(duts):
+                busy=[ worker for worker in workers.values() if worker.job is not None ]
+                limit=max_jobs
+                if self.scheduler is not None and pending:
+                    limit=self.scheduler.limit([ worker.proc.pid for worker in busy ])
+                    if self.scheduler.reason != reason and self.scheduler.estimate is not None:
+                        reason=self.scheduler.reason
+                        if reason in [ 'cpu', 'memory' ]:
+                            entity.print_log(type='I', msg='Parallel run limited to %d jobs by %s.'
+                                    % (limit,reason))
+                running=len(busy)
+                if self.reuse:
+                    idle=[ worker for worker in workers.values()
+                            if worker.job is None and not worker.stopped ]
+                    for worker in idle:
+                        if pending and running < limit:
+                            start(worker)
+                            running+=1
+                        elif self.scheduler is not None and running >= limit:
+                            # Surplus worker of a lowered limit frees its memory
+                            worker.stop()
+                    while pending and running < limit:
+                        worker=Worker(duts,method,self.threshold,prefix)
+                        workers[worker.conn]=worker
+                        start(worker)
+                        running+=1
+                elif self.scheduler is not None or not running:
+                    # Without a scheduler, new batch when the previous one has finished
+                    for n in range(min(limit-running,len(pending))):
+                        worker=Worker(duts,method,self.threshold,prefix)
+                        workers[worker.conn]=worker
+                        start(worker)
+                        running+=1
+                telemetry.tick(running)
+                telemetry.update()
+                waitfor=[ worker.conn for worker in workers.values() ] \
+                        +[ worker.proc.sentinel for worker in workers.values() ]
+                wait=[ value for value in [ 1.0 if self.timeout else None,
+                    self.status_interval if telemetry.enabled else None,
+                    self.scheduler.interval if self.scheduler is not None and pending else None ]
+                    if value is not None ]
+                multiprocessing.connection.wait(waitfor,timeout=min(wait) if wait else None)
+                now=time.monotonic()
+                for worker in list(workers.values()):
+                    exited=False
+                    # Results are read before checking the exit code
+                    try:
+                        while worker.conn.poll():
+                            message=worker.conn.recv_bytes()
+                            kind,i,value=pickle.loads(message)
+                            if kind == 'start':
+                                entity.print_log(type='I', msg='Starting parallel run %d/%d' % (i+1,len(duts)))
+                                reports[i].start=time.time()
+                                reports[i].pid=value
+                            elif kind == 'done' and i == worker.job:
+                                reports[i].nbytes=len(message)+shared_nbytes(value)
+                                telemetry.received(reports[i].nbytes)
+                                worker.job=None
+                                finished+=finish(i,'done' if value else 'failed',
+                                        decode(value),now-worker.started)
+                                if not self.reuse:
+                                    worker.stop()
+                            elif kind == 'done':
+                                # Result of a job already finished or timed out
+                                discard(value)
+                    except (EOFError,OSError):
+                        exited=True
+                    if worker.job is not None and self.timeout is not None and now-worker.started > self.timeout:
+                        entity.print_log(type='W', msg='Parallel run %d/%d exceeded timeout of %s s, killing worker %d.'
+                                % (worker.job+1,len(duts),self.timeout,worker.proc.pid))
+                        worker.kill()
+                        del workers[worker.conn]
+                        finished+=finish(worker.job,'timeout',{},now-worker.started)
+                    elif exited or worker.proc.exitcode is not None:
+                        worker.proc.join()
+                        del workers[worker.conn]
+                        if worker.job is not None:
+                            entity.print_log(type='W', msg='Worker of parallel run %d/%d exited with %s without result.'
+                                    % (worker.job+1,len(duts),worker.proc.exitcode))
+                            finished+=finish(worker.job,'crashed',{},now-worker.started,worker.proc.exitcode)
+                        worker.conn.close()
+        finally:
+            for worker in workers.values():
+                worker.stop()
+            for worker in workers.values():
+                worker.proc.join(timeout=5)
+                if worker.proc.exitcode is None:
+                    worker.kill()
+            if self.threshold is not None:
+                count=remove_shared(prefix)
+                if count:
+                    entity.print_log(type='D', msg='Removed %d shared memory files of parallel run.' %(count))
+        telemetry.tick(0)
+        telemetry.update(force=True)
+        counts={}
+        for report in reports:
+            counts[report.status]=counts.get(report.status,0)+1
+        entity.print_log(type='I', msg='Parallel run finished: %s' %
+                ', '.join('%d %s' % (count,status) for status,count in sorted(counts.items())))
+        return reports
+
+class BatchExecutor(Executor):
+    '''Batch jobs submitted with a command template.
+
+    Parameters
+    ----------
+    submission: str, None
+        Submission command prepended to the job command, e.g. 'bsub -K'.
+        LSFSUBMISSION of TheSDK.config if None.
+    workdir: str, None
+        Directory of the job and result files, visible to the execution
+        hosts. <simpath of the entity>/parallel if None.
+    python: str, sys.executable
+        Python interpreter of the jobs.
+    poll_interval: float, 0.5
+        Interval in seconds of checking for completed jobs.
+    keep: bool, False
+        Keep the job, result and log files.
+    blocking: bool, None
+        True if the submission command returns when the job has finished,
+        e.g. 'bsub -K'. If None, True for an empty submission command or
+        one with the -K option.
+    grace: float, 30.0
+        Seconds to wait for the result file after a blocking submission
+        has returned, e.g. for the attribute cache of a network
+        filesystem.
+    timeout: float, None
+        Maximum time in seconds from the submission of a non-blocking job
+        to its result file. Unlimited if None.
+
+    Jobs are complete when their result file appears. With blocking
+    submission, a job returning without a result file within grace is
+    reported as failed. Submission commands returning immediately, e.g.
+    bsub without -K, are supported, but a job killed by the batch system
+    is then detected only by timeout.
+
+    '''
+    def __init__(self,submission=None,workdir=None,python=sys.executable,
+            poll_interval=0.5,keep=False,blocking=None,grace=30.0,timeout=None):
+        self.submission=submission
+        self.workdir=workdir
+        self.python=python
+        self.poll_interval=poll_interval
+        self.keep=keep
+        self.blocking=blocking
+        self.grace=grace
+        self.timeout=timeout
+
+    def run(self,entity,duts,method,max_jobs):
+        submission=self.submission
+        if submission is None:
+            submission=entity.GLOBALS.get('LSFSUBMISSION','')
+        blocking=self.blocking
+        if blocking is None:
+            blocking=not submission.strip() or '-K' in shlex.split(submission)
+        workdir=self.workdir
+        if workdir is None:
+            workdir=os.path.join(entity.simpath,'parallel')
+        os.makedirs(workdir,exist_ok=True)
+        # Jobs find thesdk and the modules of the instances from sys.path
+        env=dict(os.environ,PYTHONPATH=os.pathsep.join(path for path in sys.path if path))
+        reports=[ JobReport(i,duts[i].runname) for i in range(len(duts)) ]
+        pending=list(range(len(duts)))
+        running={}
+        # Submission and return times of the submission commands
+        submitted={}
+        returned={}
+        while pending or running:
+            while pending and len(running) < max_jobs:
+                i=pending.pop(0)
+                jobfile=os.path.join(workdir,'job_%d.pickle' %(i))
+                with open(jobfile,'wb') as fid:
+                    pickle.dump((duts[i],method),fid)
+                command='%s %s -m thesdk.worker %s' %(submission,
+                        shlex.quote(self.python),shlex.quote(jobfile))
+                entity.print_log(type='I', msg='Submitting parallel run %d/%d' % (i+1,len(duts)))
+                reports[i].attempts+=1
+                submitted[i]=time.monotonic()
+                entity.print_log(type='D', msg=command)
+                with open(os.path.join(workdir,'job_%d.log' %(i)),'w') as log:
+                    running[i]=subprocess.Popen(command,shell=True,env=env,
+                            stdout=log,stderr=subprocess.STDOUT)
+            time.sleep(self.poll_interval)
+            for i,proc in list(running.items()):
+                resultfile=os.path.join(workdir,'job_%d.result' %(i))
+                logfile=os.path.join(workdir,'job_%d.log' %(i))
+                returncode=proc.poll()
+                now=time.monotonic()
+                if returncode is not None and i not in returned:
+                    returned[i]=now
+                status=None
+                if os.path.exists(resultfile):
+                    proc.wait()
+                    with open(resultfile,'rb') as fid:
+                        ret_dict=pickle.load(fid)
+                    status='done' if ret_dict else 'failed'
+                elif returncode is not None and returncode != 0:
+                    entity.print_log(type='W', msg='Submission of parallel run %d/%d exited with %d, see %s'
+                            % (i+1,len(duts),returncode,logfile))
+                    reports[i].exitcode=returncode
+                    status='failed'
+                elif blocking and returncode is not None and now-returned[i] > self.grace:
+                    entity.print_log(type='W', msg='Parallel run %d/%d finished without result, see %s'
+                            % (i+1,len(duts),logfile))
+                    status='failed'
+                elif not blocking and self.timeout is not None and now-submitted[i] > self.timeout:
+                    entity.print_log(type='W', msg='Parallel run %d/%d exceeded timeout of %s s, see %s'
+                            % (i+1,len(duts),self.timeout,logfile))
+                    status='timeout'
+                if status is None:
+                    continue
+                if status != 'done':
+                    ret_dict={}
+                del running[i]
+                reports[i].status=status
+                reports[i].duration=now-submitted[i]
+                entity._save_parallel_result(duts,i,ret_dict)
+                if not self.keep:
+                    for suffix in [ 'pickle', 'result', 'log' ]:
+                        try:
+                            os.remove(os.path.join(workdir,'job_%d.%s' %(i,suffix)))
+                        except OSError:
+                            pass
+        return reports
+
+def run_job(jobfile):
+    '''Runs the instance of a batch job, see BatchExecutor.
+
+    '''
+    with open(jobfile,'rb') as fid:
+        dut,method=pickle.load(fid)
+    run_dut(dut,method,FileQueue(jobfile.rsplit('.',1)[0]+'.result'))
+
+class SocketExecutor(Executor):
+    '''Socket workers, see serve.
+
+    Parameters
+    ----------
+    workers: list(str)
+        Addresses 'host:port' of the workers. Connections are distributed
+        to the workers in turn, a worker can serve several connections.
+    authkey: str or bytes, None
+        Authentication key. THESDK_AUTHKEY of the environment if None.
+
+    max_jobs connections are opened, each running one instance at a time.
+    If a connection fails, its instance is reported as failed and the
+    remaining instances are run through the other connections.
+
+    '''
+    def __init__(self,workers,authkey=None):
+        self.workers=workers
+        self.authkey=authkey
+
+    def run(self,entity,duts,method,max_jobs):
+        if not self.workers:
+            entity.print_log(type='F', msg='No socket workers given.')
+        authkey=_authkey(self.authkey)
+        reports=[ JobReport(i,duts[i].runname) for i in range(len(duts)) ]
+        tasks=queue.SimpleQueue()
+        for i in range(len(duts)):
+            tasks.put(i)
+        results=queue.SimpleQueue()
+
+        def connection(address):
+            try:
+                conn=multiprocessing.connection.Client(_address(address),authkey=authkey)
+            except Exception as error:
+                entity.print_log(type='W', msg='Connecting to %s failed: %s' % (address,error))
+                return
+            with conn:
+                while True:
+                    try:
+                        i=tasks.get_nowait()
+                    except queue.Empty:
+                        break
+                    try:
+                        entity.print_log(type='I', msg='Starting parallel run %d/%d at %s'
+                                % (i+1,len(duts),address))
+                        reports[i].attempts+=1
+                        started=time.monotonic()
+                        conn.send((duts[i],method))
+                        ret_dict=conn.recv()
+                        reports[i].duration=time.monotonic()-started
+                        results.put((i,ret_dict))
+                    except Exception as error:
+                        entity.print_log(type='W', msg='Connection to %s failed: %s' % (address,error))
+                        results.put((i,{}))
+                        return
+                conn.send(None)
+
+        threads=[ threading.Thread(target=connection,args=(self.workers[n % len(self.workers)],),daemon=True)
+                for n in range(min(max_jobs,len(duts))) ]
+        for thread in threads:
+            thread.start()
+        finished=0
+        while finished < len(duts):
+            try:
+                i,ret_dict=results.get(timeout=1.0)
+            except queue.Empty:
+                if any(thread.is_alive() for thread in threads):
+                    continue
+                # No connections left
+                try:
+                    i,ret_dict=tasks.get_nowait(),{}
+                except queue.Empty:
+                    continue
+            reports[i].status='done' if ret_dict else 'failed'
+            entity._save_parallel_result(duts,i,ret_dict)
+            finished+=1
+        for thread in threads:
+            thread.join()
+        return reports
+
+def _serve_connection(conn):
+    with conn:
+        while True:
+            try:
+                task=conn.recv()
+            except EOFError:
+                break
+            if task is None:
+                break
+            dut,method=task
+            run_dut(dut,method,ConnectionQueue(conn))
+
+def serve(address,authkey=None):
+    '''Socket worker. Accepts connections at address 'host:port' and
+    runs the instances received through each connection in a new process.
+
+    '''
+    with multiprocessing.connection.Listener(_address(address),authkey=_authkey(authkey)) as listener:
+        print('Serving thesdk parallel runs at %s:%d' % listener.address)
+        while True:
+            try:
+                conn=listener.accept()
+            except multiprocessing.AuthenticationError as error:
+                print('Rejected connection: %s' %(error))
+                continue
+            proc=multiprocessing.Process(target=_serve_connection,args=(conn,))
+            proc.start()
+            conn.close()
+
+def main(argv=None):
+    parser=argparse.ArgumentParser(prog='python -m thesdk.worker',
+            description='Worker of thesdk.run_parallel')
+    parser.add_argument('jobfile',nargs='?',help='Run a batch job')
+    parser.add_argument('--serve',metavar='HOST:PORT',help='Serve as a socket worker')
+    args=parser.parse_args(argv)
+    if args.serve:
+        serve(args.serve)
+    elif args.jobfile:
+        run_job(args.jobfile)
+    else:
+        parser.error('Give jobfile or --serve')
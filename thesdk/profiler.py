@@ -0,0 +1,189 @@
+"""
+========
+Profiler
+========
+
+Hierarchical profiler of thesdk.
+
+Timed regions are entered with Profiler.region, the decorator profiled,
+thesdk.profile or thesdk.timer. Regions nest by call: a region entered
+inside another one is recorded as its child. Each region is labeled
+with the entity hierarchy, i.e. the class names of the entity and its
+parents, and the name of the region, e.g. 'tb/rx/iofile:write'.
+
+For every path of nested regions, the call count and the total, mean and
+maximum time are aggregated. Individual calls are also recorded as trace
+events, up to max_events, for export in Chrome trace format
+(chrome://tracing, Perfetto).
+
+Only the calling process is profiled. Regions in the worker processes of
+run_parallel are not collected.
+
+Example::
+
+    with self.profile('postprocess'):
+        ...
+    thesdk.profile_report()
+    thesdk.profile_export('profile.json',format='chrome')
+
+"""
+import os
+import json
+import time
+import functools
+import threading
+import contextlib
+
+def hierarchy(entity,depth=32):
+    '''Class names of entity and its parents, separated by '/'.
+
+    '''
+    names=[]
+    while entity is not None and len(names) < depth:
+        names.append(type(entity).__name__)
+        entity=getattr(entity,'parent',None)
+    return '/'.join(reversed(names))
+
+class Profiler:
+    '''Collector of timed regions.
+
+    Parameters
+    ----------
+    max_events: int, 100000
+        Maximum number of trace events stored. Aggregated statistics
+        are collected also after the limit is reached.
+
+    '''
+    def __init__(self,max_events=100000):
+        self.enabled=True
+        self.max_events=max_events
+        self._lock=threading.Lock()
+        self._local=threading.local()
+        self.reset()
+
+    def reset(self):
+        '''Discards the collected statistics and events.
+
+        '''
+        with self._lock:
+            # Path of labels -> [count, total, max]
+            self.stats={}
+            self.events=[]
+
+    def _stack(self):
+        stack=getattr(self._local,'stack',None)
+        if stack is None:
+            stack=self._local.stack=[]
+        return stack
+
+    @contextlib.contextmanager
+    def region(self,name,entity=None):
+        '''Context manager timing the enclosed code as region name of entity.
+
+        '''
+        if not self.enabled:
+            yield
+            return
+        stack=self._stack()
+        stack.append(name if entity is None else '%s:%s' %(hierarchy(entity),name))
+        path=tuple(stack)
+        start=time.perf_counter()
+        try:
+            yield
+        finally:
+            duration=time.perf_counter()-start
+            stack.pop()
+            self.record(path,start,duration)
+
+    def record(self,path,start,duration):
+        '''Records a call of the region at path, started at start
+        (time.perf_counter) and lasting duration seconds.
+
+        '''
+        with self._lock:
+            stat=self.stats.get(path)
+            if stat is None:
+                stat=self.stats[path]=[0,0.0,0.0]
+            stat[0]+=1
+            stat[1]+=duration
+            if duration > stat[2]:
+                stat[2]=duration
+            if len(self.events) < self.max_events:
+                self.events.append((path[-1],start,duration,threading.get_ident()))
+
+    def summary(self):
+        '''Aggregated statistics.
+
+        Returns
+        -------
+        list(dict)
+            Keys 'path', 'count', 'total', 'mean' and 'max', times in
+            seconds, in depth-first order of the paths.
+
+        '''
+        with self._lock:
+            items=sorted(self.stats.items())
+        return [ { 'path' : list(path), 'count' : count, 'total' : total,
+            'mean' : total/count, 'max' : maximum }
+            for path,(count,total,maximum) in items ]
+
+    def report(self):
+        '''Returns the aggregated statistics as a printable tree.
+
+        '''
+        lines=[ '%-60s %8s %12s %12s %12s' %('Region','Count','Total [s]','Mean [s]','Max [s]') ]
+        for item in self.summary():
+            label='  '*(len(item['path'])-1)+item['path'][-1]
+            lines.append('%-60s %8d %12.6f %12.6f %12.6f' %(label,item['count'],
+                item['total'],item['mean'],item['max']))
+        return '\n'.join(lines)
+
+    def chrome_trace(self):
+        '''Trace events in Chrome trace format.
+
+        '''
+        pid=os.getpid()
+        with self._lock:
+            events=list(self.events)
+        return { 'traceEvents' : [ { 'name' : name, 'ph' : 'X', 'ts' : start*1e6,
+            'dur' : duration*1e6, 'pid' : pid, 'tid' : tid }
+            for name,start,duration,tid in events ],
+            'displayTimeUnit' : 'ms' }
+
+    def export(self,filename,format='json'):
+        '''Writes the statistics to filename.
+
+        Parameters
+        ----------
+        format: str, 'json'
+            'json' for the aggregated statistics, see summary.
+            'chrome' for the trace events in Chrome trace format.
+
+        '''
+        if format == 'json':
+            data={ 'pid' : os.getpid(), 'regions' : self.summary() }
+        elif format == 'chrome':
+            data=self.chrome_trace()
+        else:
+            raise ValueError('Profile format %s not supported' %(format))
+        with open(filename,'w') as fid:
+            json.dump(data,fid)
+
+# Profiler of this process
+profiler=Profiler()
+
+def profiled(name=None):
+    '''Decorator timing a method of an entity as a region. The region
+    is named name, or the name of the method if None.
+
+    '''
+    def decorator(func):
+        region=func.__name__ if name is None else name
+        @functools.wraps(func)
+        def wrapper(self,*args,**kwargs):
+            if not profiler.enabled:
+                return func(self,*args,**kwargs)
+            with profiler.region(region,self):
+                return func(self,*args,**kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,70 @@
+"""
+=====
+Runid
+=====
+
+Unique run identifiers without filesystem calls.
+
+A run identifier is of form timestamp_tag, e.g. '20201002103638_tmp4kq7x2m901b3c0',
+where the tag is composed of
+
+    'tmp'
+        Constant prefix, for compatibility with the earlier names.
+    token
+        8 random base-36 characters (41 bits), drawn once per process
+        with secrets.randbelow, i.e. uniformly.
+    pid
+        Process id in 5 base-36 digits.
+    counter
+        Number of identifiers generated in the process, in base 36.
+
+The pid and counter make the identifiers unique among the processes
+running on a host, e.g. the workers of run_parallel. The random token
+separates processes on different hosts sharing a filesystem, and
+processes reusing a pid.
+
+Example::
+
+    import thesdk.runid as runid
+    name=runid.new()
+
+"""
+import os
+import time
+import secrets
+import itertools
+import threading
+
+_digits='0123456789abcdefghijklmnopqrstuvwxyz'
+
+def _base36(value,width=1):
+    chars=[]
+    while value or len(chars) < width:
+        value,digit=divmod(value,36)
+        chars.append(_digits[digit])
+    return ''.join(reversed(chars))
+
+def _reset():
+    global _token, _pid, _counter
+    _token=_base36(secrets.randbelow(36**8),8)
+    _pid=_base36(os.getpid() % 36**5,5)
+    _counter=itertools.count()
+
+_lock=threading.Lock()
+_reset()
+if hasattr(os,'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset)
+
+def tag():
+    '''Unique tag, without the timestamp.
+
+    '''
+    with _lock:
+        count=next(_counter)
+    return 'tmp%s%s%s' %(_token,_pid,_base36(count))
+
+def new():
+    '''Unique run identifier of form timestamp_tag.
+
+    '''
+    return '%s_%s' %(time.strftime('%Y%m%d%H%M%S'),tag())
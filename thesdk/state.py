@@ -0,0 +1,585 @@
+"""
+=====
+State
+=====
+
+State store of thesdk entities with state_format 'npy'.
+
+The entity is pickled without its large NumPy arrays. Every array of at
+least `threshold` bytes found anywhere in the entity is written to a
+separate .npy file and replaced by a reference in the pickle. On load,
+the arrays are memory-mapped copy-on-write, so loading costs the size of
+the metadata plus lazy paging of the data actually used.
+
+A state directory contains:
+
+    manifest.json
+        Format, version, runname, the reference of the Data of every IO,
+        and the dtype and shape of every array.
+    entity.pickle
+        The entity with array references.
+    ios.pickle
+        Data of IOs not stored as arrays, i.e. small or non-array Data.
+    extracts.pickle
+        The extracts bundle with array references.
+    arrays/<ref>.npy
+        The arrays.
+
+    arrays/<ref>.<codec>
+        The raw bytes of the arrays in compressed chunks, if the state is
+        compressed. See ChunkWriter.
+
+The IOs and extracts can be loaded without loading entity.pickle, and
+IOs can be loaded selectively by name.
+
+States can be compressed with codec 'zstd', 'lz4' or 'zlib'. With the
+'npy' format, the array payloads are compressed in chunks, see
+ChunkWriter. With the 'pickle' format, state.pickle is compressed to
+state.pickle.<codec>, see dump_pickle.
+
+Catalogue indexes the saved states of a state path, independent of the
+state format.
+
+"""
+import os
+import json
+import time
+import zlib
+import struct
+import pickle
+import shutil
+import numpy as np
+
+import thesdk.runid as runid
+
+FORMAT='thesdk-state'
+VERSION=1
+
+# Size of the uncompressed chunks of compressed files in bytes
+CHUNKSIZE=4*1024*1024
+
+def _zstd():
+    import zstandard
+    return (zstandard.ZstdCompressor(level=3).compress,
+            zstandard.ZstdDecompressor().decompress)
+
+def _lz4():
+    import lz4.frame
+    return (lz4.frame.compress, lz4.frame.decompress)
+
+def _zlib():
+    return (lambda data: zlib.compress(data,1), zlib.decompress)
+
+# Compression codecs in order of preference
+_codecs={ 'zstd' : _zstd, 'lz4' : _lz4, 'zlib' : _zlib }
+
+def codec(name):
+    '''Compression codec.
+
+    Parameters
+    ----------
+    name: str
+        'zstd' | 'lz4' | 'zlib' | 'auto'. 'auto' selects the first of
+        'zstd', 'lz4' and 'zlib' that is available.
+
+    Returns
+    -------
+    (str, callable, callable)
+        Name of the codec, compress and decompress functions.
+
+    Raises
+    ------
+    ImportError
+        If the module of the codec is not installed.
+
+    '''
+    if name == 'auto':
+        for candidate in _codecs:
+            try:
+                return (candidate,)+_codecs[candidate]()
+            except ImportError:
+                pass
+    if name not in _codecs:
+        raise ValueError('Compression %s not supported' %(name))
+    return (name,)+_codecs[name]()
+
+class ChunkWriter:
+    '''Write-only file object compressing its contents in chunks of
+    CHUNKSIZE bytes. Each chunk is stored as its compressed length
+    (uint32, little endian) followed by the compressed bytes.
+
+    '''
+    def __init__(self,fid,compress):
+        self.fid=fid
+        self.compress=compress
+        self._buffer=bytearray()
+
+    def write(self,data):
+        data=memoryview(data).cast('B')
+        self._buffer+=data
+        while len(self._buffer) >= CHUNKSIZE:
+            self._put(self._buffer[:CHUNKSIZE])
+            del self._buffer[:CHUNKSIZE]
+        return len(data)
+
+    def write_array(self,array):
+        '''Writes the raw bytes of array without an intermediate copy.
+
+        '''
+        flat=np.ascontiguousarray(array).reshape(-1).view(np.uint8)
+        self.close_chunk()
+        for start in range(0,len(flat),CHUNKSIZE):
+            self._put(flat[start:start+CHUNKSIZE])
+
+    def _put(self,data):
+        compressed=self.compress(data)
+        self.fid.write(struct.pack('<I',len(compressed)))
+        self.fid.write(compressed)
+
+    def close_chunk(self):
+        if self._buffer:
+            self._put(self._buffer)
+            self._buffer=bytearray()
+
+    def close(self):
+        self.close_chunk()
+
+class ChunkReader:
+    '''Read-only file object of a file written with ChunkWriter.
+
+    '''
+    def __init__(self,fid,decompress):
+        self.fid=fid
+        self.decompress=decompress
+        self._buffer=b''
+        self._position=0
+
+    def _next(self):
+        header=self.fid.read(4)
+        if len(header) < 4:
+            return False
+        self._buffer=self.decompress(self.fid.read(struct.unpack('<I',header)[0]))
+        self._position=0
+        return True
+
+    def read(self,size=-1):
+        parts=[]
+        while size != 0:
+            if self._position >= len(self._buffer) and not self._next():
+                break
+            end=len(self._buffer) if size < 0 else min(len(self._buffer),self._position+size)
+            parts.append(self._buffer[self._position:end])
+            if size > 0:
+                size-=end-self._position
+            self._position=end
+        return b''.join(parts)
+
+    def readinto(self,buffer):
+        buffer=memoryview(buffer).cast('B')
+        count=0
+        while count < len(buffer):
+            if self._position >= len(self._buffer) and not self._next():
+                break
+            size=min(len(buffer)-count,len(self._buffer)-self._position)
+            buffer[count:count+size]=self._buffer[self._position:self._position+size]
+            self._position+=size
+            count+=size
+        return count
+
+    def readline(self):
+        parts=[]
+        while True:
+            if self._position >= len(self._buffer) and not self._next():
+                break
+            end=self._buffer.find(b'\n',self._position)
+            end=len(self._buffer) if end < 0 else end+1
+            parts.append(self._buffer[self._position:end])
+            self._position=end
+            if parts[-1].endswith(b'\n'):
+                break
+        return b''.join(parts)
+
+    def read_array(self,dtype,shape):
+        '''Reads an array written with ChunkWriter.write_array.
+
+        '''
+        array=np.empty(shape,dtype=dtype)
+        if self.readinto(array.reshape(-1).view(np.uint8)) != array.nbytes:
+            raise ValueError('Truncated array data')
+        return array
+
+class ArrayPickler(pickle.Pickler):
+    '''Pickler storing ndarrays of at least store.threshold bytes to
+    store instead of the pickle.
+
+    '''
+    def __init__(self,file,store):
+        super().__init__(file,protocol=pickle.HIGHEST_PROTOCOL)
+        self.store=store
+
+    def persistent_id(self,obj):
+        if isinstance(obj,np.ndarray) and not obj.dtype.hasobject \
+                and obj.nbytes >= self.store.threshold:
+            return self.store.add(obj)
+        return None
+
+class ArrayUnpickler(pickle.Unpickler):
+    '''Unpickler loading array references from store.
+
+    '''
+    def __init__(self,file,store):
+        super().__init__(file)
+        self.store=store
+
+    def persistent_load(self,ref):
+        return self.store.load(ref)
+
+class StateStore:
+    '''State directory of a single run.
+
+    Parameters
+    ----------
+    path: str
+        State directory.
+    threshold: int, 4096
+        Minimum size in bytes of arrays stored as separate files.
+    compression: str, None
+        Codec of the array files written, see codec. Arrays are not
+        compressed if None. Compressed arrays are decompressed to memory
+        when loaded instead of memory-mapped.
+
+    '''
+    def __init__(self,path,threshold=4096,compression=None):
+        self.path=path
+        self.threshold=threshold
+        self._codec=codec(compression) if compression else None
+        self._refs={}
+        self._objects=[]
+        self._loaded={}
+        self._manifest=None
+
+    @staticmethod
+    def exists(path):
+        '''True if path contains a state in this format.
+
+        '''
+        return os.path.isfile(os.path.join(path,'manifest.json'))
+
+    @property
+    def manifest(self):
+        '''dict: Contents of manifest.json.
+
+        '''
+        if self._manifest is None:
+            with open(os.path.join(self.path,'manifest.json')) as fid:
+                self._manifest=json.load(fid)
+            if self._manifest.get('format') != FORMAT or self._manifest.get('version',0) > VERSION:
+                raise ValueError('Unsupported state format in %s' %(self.path))
+        return self._manifest
+
+    def _arrayfile(self,ref,suffix='npy'):
+        return os.path.join(self.path,'arrays','%s.%s' %(ref,suffix))
+
+    def add(self,array):
+        '''Stores array, returns its reference. Arrays are stored once per object.
+
+        '''
+        if id(array) not in self._refs:
+            ref='a%d' %(len(self._refs))
+            if self._codec is None:
+                np.save(self._arrayfile(ref),array,allow_pickle=False)
+            else:
+                with open(self._arrayfile(ref,self._codec[0]),'wb') as fid:
+                    ChunkWriter(fid,self._codec[1]).write_array(array)
+            self._refs[id(array)]=ref
+            # Keep the object alive to keep its id unique
+            self._objects.append(array)
+        return self._refs[id(array)]
+
+    def load(self,ref):
+        '''Memory-maps the array with reference ref copy-on-write.
+        Each reference is mapped once, so arrays shared in the saved
+        entity are shared also when loaded.
+
+        '''
+        if ref not in self._loaded:
+            compression=self.manifest.get('compression')
+            if compression is None:
+                self._loaded[ref]=np.load(self._arrayfile(ref),mmap_mode='c')
+            else:
+                name,_,decompress=codec(compression)
+                spec=self.manifest['arrays'][ref]
+                with open(self._arrayfile(ref,name),'rb') as fid:
+                    self._loaded[ref]=ChunkReader(fid,decompress).read_array(
+                            np.dtype(spec['dtype']),tuple(spec['shape']))
+        return self._loaded[ref]
+
+    def _dump(self,name,obj):
+        with open(os.path.join(self.path,name),'wb') as fid:
+            ArrayPickler(fid,self).dump(obj)
+
+    def _undump(self,name):
+        with open(os.path.join(self.path,name),'rb') as fid:
+            return ArrayUnpickler(fid,self).load()
+
+    def write(self,entity):
+        '''Writes the state of entity.
+
+        '''
+        os.makedirs(os.path.join(self.path,'arrays'),exist_ok=True)
+        self._dump('entity.pickle',entity)
+        ios={}
+        inline={}
+        for name,io in entity.IOS.Members.items():
+            data=getattr(io,'Data',None)
+            if isinstance(data,np.ndarray) and id(data) in self._refs:
+                ios[name]=self._refs[id(data)]
+            else:
+                ios[name]=None
+                inline[name]=data
+        self._dump('ios.pickle',inline)
+        self._dump('extracts.pickle',entity.extracts)
+        arrays={ ref : { 'dtype' : obj.dtype.str, 'shape' : list(obj.shape) }
+                for ref,obj in zip(self._refs.values(),self._objects) }
+        manifest={
+                'format' : FORMAT,
+                'version' : VERSION,
+                'runname' : entity.runname,
+                'time' : time.time(),
+                'compression' : self._codec[0] if self._codec else None,
+                'ios' : ios,
+                'arrays' : arrays,
+                }
+        # Manifest is written last, it marks the state complete
+        with open(os.path.join(self.path,'manifest.json'),'w') as fid:
+            json.dump(manifest,fid,indent=1)
+        self._refs={}
+        self._objects=[]
+
+    def load_entity(self):
+        '''Loads the full entity. Arrays are memory-mapped.
+
+        '''
+        return self._undump('entity.pickle')
+
+    def load_ios(self,names=None):
+        '''Loads the Data of IOs.
+
+        Parameters
+        ----------
+        names: list(str), None
+            Names of the IOs to load. All if None.
+
+        Returns
+        -------
+        dict
+            Data keyed by IO name.
+
+        '''
+        ios=self.manifest['ios']
+        if names is None:
+            names=list(ios.keys())
+        inline=None
+        result={}
+        for name in names:
+            if ios[name] is not None:
+                result[name]=self.load(ios[name])
+            else:
+                if inline is None:
+                    inline=self._undump('ios.pickle')
+                result[name]=inline[name]
+        return result
+
+    def load_extracts(self):
+        '''Loads the extracts bundle.
+
+        '''
+        return self._undump('extracts.pickle')
+
+def dump_pickle(obj,path,compression=None):
+    '''Pickles obj to path, or compressed to path.<codec> with ChunkWriter.
+
+    Returns
+    -------
+    str
+        Path of the written file.
+
+    '''
+    if not compression:
+        with open(path,'wb') as fid:
+            pickle.dump(obj,fid)
+        return path
+    name,compress,_=codec(compression)
+    path='%s.%s' %(path,name)
+    with open(path,'wb') as fid:
+        writer=ChunkWriter(fid,compress)
+        pickle.dump(obj,writer)
+        writer.close()
+    return path
+
+def load_pickle(path):
+    '''Loads a pickle written with dump_pickle. The compression is
+    detected from the name of the existing file.
+
+    '''
+    if os.path.isfile(path):
+        with open(path,'rb') as fid:
+            return pickle.load(fid)
+    for name in _codecs:
+        if os.path.isfile('%s.%s' %(path,name)):
+            decompress=codec(name)[2]
+            with open('%s.%s' %(path,name),'rb') as fid:
+                return pickle.load(ChunkReader(fid,decompress))
+    raise FileNotFoundError('No such file: %s' %(path))
+
+def replace_dir(src,dst):
+    '''Moves the directory src to dst, replacing an existing dst.
+
+    The replaced directory is renamed aside and removed, so its files are
+    unlinked, not truncated, and memory maps of them remain valid. dst
+    does not exist for the short time between the two renames.
+
+    '''
+    old=None
+    if os.path.isdir(dst):
+        old='%s.%s' %(dst,runid.tag())
+        os.replace(dst,old)
+    os.replace(src,dst)
+    if old is not None:
+        shutil.rmtree(old,ignore_errors=True)
+
+def _jsonable(value):
+    '''value if it can be stored to JSON as is, else its repr.
+
+    '''
+    if value is None or isinstance(value,(bool,int,float,str)):
+        return value
+    if isinstance(value,np.generic):
+        return value.item()
+    if isinstance(value,(list,tuple)) and all(v is None or isinstance(v,(bool,int,float,str)) for v in value):
+        return list(value)
+    return repr(value)
+
+class Catalogue:
+    '''Append-only index of the states saved under a state path.
+
+    One JSON record per line in <statepath>/catalogue.jsonl, with keys
+    'runname', 'time', 'model', 'format', 'parameters' and 'extracts'.
+    Parameters are the values of the properties in the proplist of the
+    entity, extracts the scalar members of its extracts bundle. Values not
+    representable in JSON are stored as their repr.
+
+    Parameters
+    ----------
+    statepath: str
+        Directory of the states.
+
+    '''
+    def __init__(self,statepath):
+        self.statepath=statepath
+        self.path=os.path.join(statepath,'catalogue.jsonl')
+
+    def exists(self):
+        return os.path.isfile(self.path)
+
+    def add(self,entity):
+        '''Appends the record of the saved state of entity.
+
+        '''
+        parameters={}
+        for prop in getattr(entity,'proplist',[]):
+            if hasattr(entity,prop):
+                parameters[prop]=_jsonable(getattr(entity,prop))
+        extracts={ key : _jsonable(value) for key,value in entity.extracts.Members.items()
+                if not isinstance(value,np.ndarray) or value.ndim == 0 }
+        record={
+                'runname' : entity.runname,
+                'time' : time.time(),
+                'model' : entity.model,
+                'format' : entity.state_format,
+                'parameters' : parameters,
+                'extracts' : extracts,
+                }
+        line=(json.dumps(record)+'\n').encode('utf-8')
+        # Single write with O_APPEND, concurrent writers do not interleave lines
+        fd=os.open(self.path,os.O_WRONLY|os.O_APPEND|os.O_CREAT,0o644)
+        try:
+            os.write(fd,line)
+        finally:
+            os.close(fd)
+
+    def records(self):
+        '''All records, oldest first. Corrupted lines are skipped.
+
+        '''
+        result=[]
+        try:
+            with open(self.path,'rb') as fid:
+                for line in fid:
+                    try:
+                        result.append(json.loads(line))
+                    except ValueError:
+                        pass
+        except OSError:
+            pass
+        return result
+
+    def reversed(self,blocksize=65536):
+        '''Records from the newest to the oldest. Reads the file backwards
+        in blocks, so the newest records are found without reading the
+        whole file.
+
+        '''
+        try:
+            fid=open(self.path,'rb')
+        except OSError:
+            return
+        with fid:
+            position=fid.seek(0,os.SEEK_END)
+            tail=b''
+            while position > 0:
+                size=min(blocksize,position)
+                position-=size
+                fid.seek(position)
+                lines=(fid.read(size)+tail).split(b'\n')
+                # First line may be incomplete, unless at start of file
+                tail=lines.pop(0)
+                for line in reversed(lines):
+                    if line.strip():
+                        try:
+                            yield json.loads(line)
+                        except ValueError:
+                            pass
+            if tail.strip():
+                try:
+                    yield json.loads(tail)
+                except ValueError:
+                    pass
+
+    def latest(self):
+        '''Runname of the newest record with an existing state directory,
+        None if not found.
+
+        '''
+        for record in self.reversed():
+            if os.path.isdir(os.path.join(self.statepath,record['runname'])):
+                return record['runname']
+        return None
+
+    def find(self,**parameters):
+        '''Records whose parameters match all the given values, oldest first.
+
+        Example::
+
+            Catalogue(statepath).find(gain=3,model='py')
+
+        Key 'model' matches the model of the record.
+
+        '''
+        result=[]
+        for record in self.records():
+            values=dict(record.get('parameters',{}),model=record.get('model'))
+            if all(key in values and values[key] == _jsonable(value)
+                    for key,value in parameters.items()):
+                result.append(record)
+        return result
@@ -0,0 +1,17 @@
+"""
+======
+Worker
+======
+
+Entry point of the worker processes of run_parallel, see thesdk.parallel::
+
+    # Run a batch job
+    python -m thesdk.worker <jobfile>
+    # Serve as a socket worker
+    THESDK_AUTHKEY=<key> python -m thesdk.worker --serve <host>:<port>
+
+"""
+import thesdk.parallel as parallel
+
+if __name__=="__main__":
+    parallel.main()